@@ -1,4 +1,5 @@
 import os
+import heapq
 from datetime import timedelta
 from datetime import datetime
 from shinywaffle.common.event.event_handler import EventHandler
@@ -14,11 +15,19 @@ class Backtester:
     """
     Class for holding the backtesting code
 
+    The timeline of the backtest is either
+        - 'fixed': Steps of time_increment from the start to the end of the backtest
+        - 'bars': One step for each distinct timestamp of the bars of the assets. Weekends, holidays and hours outside
+                  of the trading sessions are skipped, so every step after the first one has at least one new bar
+
     """
 
+    timelines = ('fixed', 'bars')
+
     def __init__(self, context: Context, time_increment: str, run_from: datetime = None,
                  run_to: datetime = None, path: str = os.getcwd(),
-                 filename: str = "Summary {}".format(datetime.now().strftime("%d-%m-%Y %H%M%S"))):
+                 filename: str = "Summary {}".format(datetime.now().strftime("%d-%m-%Y %H%M%S")),
+                 timeline: str = 'fixed'):
 
         self.context = context
         self.account = context.account
@@ -31,6 +40,9 @@ class Backtester:
 
         self.run_from = run_from
         self.run_to = run_to
+        self.timeline = timeline
+
+        assert self.timeline in Backtester.timelines
 
         if self.run_from is not None:
             assert isinstance(self.run_from, datetime)
@@ -43,26 +55,50 @@ class Backtester:
 
     def make_times(self):
 
+        if self.timeline == 'bars':
+            self.make_bar_times()
+            return
+
         dt = get_backtest_dt(self.time_increment)
         num_steps = int((self.backtest_to - self.backtest_from).days / dt)
         self.times = [self.backtest_from + i*timedelta(days=dt) for i in range(0, num_steps)]
 
+    def make_bar_times(self):
+
+        """
+        Making the timeline from the bar timestamps of all the assets. The sorted timestamps of each asset are
+        combined with a k-way merge and duplicates are dropped.
+
+        The first step is the start of the backtest, which retrieves all the bars before it. Like in the fixed
+        timeline, the end of the backtest is not included.
+        """
+
+        backtest_from = self.backtest_from
+        backtest_to = self.backtest_to
+        asset_times = [asset.bars.times_between(backtest_from, backtest_to) for asset in self.assets.values()]
+
+        self.times = [backtest_from]
+        for t in heapq.merge(*asset_times):
+            if t != self.times[-1] and t < backtest_to:
+                self.times.append(t)
+
     def copy(self):
-        return Backtester(self.context.copy(), self.time_increment, self.run_from, self.run_to)
+        return Backtester(self.context.copy(), self.time_increment, self.run_from, self.run_to,
+                          timeline=self.timeline)
 
     @property
     def backtest_from(self):
         if self.run_from is not None:
             return self.run_from
         else:
-            return min([s.bars[-1].datetime for ticker, s in self.assets.items()])
+            return min([s.bars[-1].time for ticker, s in self.assets.items()])
 
     @property
     def backtest_to(self):
         if self.run_to is not None:
             return self.run_to
         else:
-            return max([s.bars[0].datetime for ticker, s in self.assets.items()])
+            return max([s.bars[0].time for ticker, s in self.assets.items()])
 
     def report(self):
         data = {
@@ -1,7 +1,7 @@
 import numpy as np
 from shinywaffle.common.context import Context
 from shinywaffle.backtesting import orders as orders_module
-from shinywaffle.data.intrabar_simulation import simulate_intrabar_data
+from shinywaffle.backtesting.fill_models import SimulatedPathFillModel
 
 
 class BacktestBroker:
@@ -14,17 +14,20 @@ class BacktestBroker:
 
     """
 
-    def __init__(self, context: Context, fee: float):
+    def __init__(self, context: Context, fee: float, fill_model=None):
         """
         Modelling slippage as a normal distribution with mean 0 and standard deviation of 0.05. Generating 100000
         values.
 
         :param context: Context object containing all the cogs
         :param fee: Fee percentage
+        :param fill_model: FillModel deciding if and at what price the limit orders within a bar are filled. Defaults
+        to SimulatedPathFillModel
         """
         self.context = context
         self.name = 'Basic broker'
         self.fee = fee
+        self.fill_model = fill_model if fill_model is not None else SimulatedPathFillModel()
         self.total_commission = 0
         self.order_book = orders_module.OrderBook(context)
         self.slippages = abs(np.random.normal(0, 0.05, 100000)).tolist()
@@ -50,10 +53,10 @@ class BacktestBroker:
         filled and the price is calculated from the self.get_market_order_price method. If the order is a limit order,
         then the order limit price is checked versus the current bar to see if it would be possible to fill.
 
-        If is will be filled, then the intra bar prices are simulated using the simulate_intrabar_data method. If the
-        order is a buy order, the order will be filled at the price that is first equal to or below the order limit
-        price. If it is a sell order, then it will be filled at the price that is first equal to or above the
-        order limit price.
+        If it is, the fill_model decides whether the order is filled and at what price. The default
+        SimulatedPathFillModel simulates the intra bar prices using the simulate_intrabar_data method. If the order is
+        a buy order, the order will be filled at the price that is first equal to or below the order limit price. If it
+        is a sell order, then it will be filled at the price that is first equal to or above the order limit price.
 
         :param order_id: ID of the order to check
         :return: OrderFilledEvent
@@ -66,31 +69,69 @@ class BacktestBroker:
             event = self.fill_order(order, price)
 
         elif isinstance(order, orders_module.LimitOrder):
-            event = None
             if self.is_order_within_bar(order):
-                bar = self.context.retrieved_data[order.asset.ticker]['bars'][0]
-                previous_bar = self.context.retrieved_data[order.asset.ticker]['bars'][1]
-                total_t = (bar.time - previous_bar.time).days
-                intra_bar_prices = simulate_intrabar_data(bar, total_t, 0.01)
-
-                # Finding fill price for BuyOrder
-                if isinstance(order, orders_module.BuyOrder):
-                    for price in intra_bar_prices:
-                        if price <= order.order_limit_price:
-                            # event = self.fill_order(order, order.order_limit_price)
-                            event = self.fill_order(order, price)
-                            break
-
-                # Finding fill price for SellOrder
-                elif isinstance(order, orders_module.SellOrder):
-                    for price in intra_bar_prices:
-                        if price >= order.order_limit_price:
-                            # event = self.fill_order(order, order.order_limit_price)
-                            event = self.fill_order(order, price)
-                            break
+                filled_events = self.fill_limit_orders([order])
+                if filled_events:
+                    event = filled_events[0]
 
         return event
 
+    def match_limit_orders(self, tickers=None, latest_id=None) -> list:
+
+        """
+        Method that matches the pending limit orders against the latest bars in one pass. The orders with a limit price
+        inside [bar.low, bar.high] are found with a range query on the LimitBook of the asset and are filled with
+        fill_limit_orders in the order they were placed.
+
+        :param tickers: Tickers of the assets with a new bar. If None, the orders of all assets are matched
+        :param latest_id: If given, only the orders with a lower id are matched
+        :return: list of OrderFilledEvents
+        """
+
+        matched_orders = []
+        for ticker, limit_book in self.order_book.limit_books.items():
+            if limit_book and (tickers is None or ticker in tickers):
+                bars = self.context.retrieved_data[ticker]['bars']
+                matched_orders += limit_book.in_range(bars.low[0], bars.high[0])
+
+        if latest_id is not None:
+            matched_orders = [o for o in matched_orders if o.id < latest_id]
+
+        matched_orders.sort(key=lambda o: o.id)
+        return self.fill_limit_orders(matched_orders)
+
+    def fill_limit_orders(self, orders) -> list:
+
+        """
+        Method that fills the limit orders within the latest bars in one batch. The fill_model decides which of the
+        orders are filled and at what price.
+
+        :param orders: Limit orders with the limit price within the latest bar of their asset
+        :return: list of OrderFilledEvents
+        """
+
+        bars = []
+        total_ts = []
+        for order in orders:
+            asset_bars = self.context.retrieved_data[order.asset.ticker]['bars']
+            bar = asset_bars[0]
+            previous_bar = asset_bars[1]
+
+            # The times of the Bar objects are datetimes for both plain and columnar series
+            bars.append(bar)
+            total_ts.append((bar.time - previous_bar.time).days)
+
+        prices, _ = self.fill_model.fill(bars, [order.order_limit_price for order in orders],
+                                         [order.side for order in orders], total_ts,
+                                         [order.asset.ticker for order in orders])
+
+        filled_events = []
+        for order, price in zip(orders, prices):
+            if not np.isnan(price):
+                filled_events.append(self.fill_order(order, float(price)))
+
+        return filled_events
+
     def is_order_within_bar(self, order) -> bool:
 
         """
@@ -101,8 +142,8 @@ class BacktestBroker:
         :return: True/False
         """
 
-        bar = self.context.retrieved_data[order.asset.ticker]['bars'][0]
-        if bar.low <= order.order_limit_price <= bar.high:
+        bars = self.context.retrieved_data[order.asset.ticker]['bars']
+        if bars.low[0] <= order.order_limit_price <= bars.high[0]:
             return True
         else:
             return False
@@ -146,7 +187,7 @@ class BacktestBroker:
             slippage *= -1
 
         # Open or close price? Should be open price if it is filled during the next bar
-        return price_data['bars'][0].open + slippage
+        return price_data['bars'].open[0] + slippage
 
     def calculate_commission(self, order_size: float) -> float:
         """
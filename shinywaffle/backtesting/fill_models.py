@@ -0,0 +1,252 @@
+import numpy as np
+from datetime import timedelta
+from shinywaffle.data.time_series_data import TimeSeries, ColumnarTimeSeries
+from shinywaffle.data.intrabar_simulation import simulate_intrabar_data, simulate_intrabar_paths, first_crossing
+
+
+class FillModel:
+
+    """
+    Base class for the models deciding if and at what price the limit orders within a bar are filled. The broker calls
+    fill with all limit orders matched in a step.
+    """
+
+    def fill(self, bars, limit_prices, sides, total_ts, tickers=None):
+        """
+        :param bars: Latest bar of the asset of each order
+        :param limit_prices: Limit price of each order
+        :param sides: 'buy' or 'sell' for each order
+        :param total_ts: Duration of each bar in days
+        :param tickers: Ticker of the asset of each order
+        :return: tuple of an array with the fill price of each order (nan if it is not filled) and an array with the
+        time of the fill as a fraction of the bar
+        """
+        raise NotImplementedError
+
+
+class SimulatedPathFillModel(FillModel):
+
+    """
+    Simulating the intra bar prices of each order with simulate_intrabar_data and filling the order at the first price
+    equal to or below the limit price of a buy order, or equal to or above the limit price of a sell order
+    """
+
+    def __init__(self, dt=0.01):
+        self.dt = dt
+
+    def fill(self, bars, limit_prices, sides, total_ts, tickers=None):
+        prices = np.full(len(bars), np.nan)
+        times = np.full(len(bars), np.nan)
+        for i, (bar, limit_price, side, total_t) in enumerate(zip(bars, limit_prices, sides, total_ts)):
+            path = np.array(simulate_intrabar_data(bar, total_t, self.dt))
+            index, price = first_crossing(path, limit_price, side)
+            if index[0] >= 0:
+                prices[i] = price[0]
+                times[i] = index[0] / (path.size - 1)
+        return prices, times
+
+
+class VectorizedPathFillModel(FillModel):
+
+    """
+    Simulating the intra bar prices of all orders on bars of the same duration at once with simulate_intrabar_paths and
+    finding the first crossing of the limit prices with a vectorized search
+    """
+
+    def __init__(self, dt=0.01):
+        self.dt = dt
+
+    def fill(self, bars, limit_prices, sides, total_ts, tickers=None):
+        prices = np.full(len(bars), np.nan)
+        times = np.full(len(bars), np.nan)
+
+        batches = dict()
+        for i, total_t in enumerate(total_ts):
+            batches.setdefault(total_t, []).append(i)
+
+        for total_t, batch in batches.items():
+            paths = simulate_intrabar_paths([bars[i].open for i in batch], [bars[i].high for i in batch],
+                                            [bars[i].low for i in batch], [bars[i].close for i in batch],
+                                            total_t, self.dt)
+            indices, batch_prices = first_crossing(paths, [limit_prices[i] for i in batch], [sides[i] for i in batch])
+            filled = indices >= 0
+            prices[batch] = batch_prices
+            times[batch] = np.where(filled, indices / (paths.shape[1] - 1), np.nan)
+
+        return prices, times
+
+
+class BrownianBridgeFillModel(FillModel):
+
+    """
+    Closed form fill model. Instead of simulating a path, the fill of each order is sampled in O(1) from Brownian
+    bridges between the open, the low and the high (in random order) and the close of the bar, like the paths of
+    simulate_intrabar_data.
+
+    A sell order is handled as a buy order on the mirrored prices. A buy order with a limit price at or above the open
+    is filled at the open. Otherwise the path has to come down to the limit price. If the low comes first, the limit
+    price is reached on the way from the open to the low. If the high comes first, the bridge from the open to the high
+    reaches the limit price with the probability exp(-2 (open - limit) (high - limit) / variance), and if it does not,
+    the limit price is reached on the way from the high to the low. The time of the fill is the expected hitting time on
+    the segment.
+
+    A path monitored in discrete steps crosses the limit price with an overshoot. With discrete_correction, the fill
+    price is moved past the limit price by 0.5826 times the standard deviation of the steps (the continuity correction
+    of Broadie, Glasserman and Kou), but not past the low.
+    """
+
+    # -zeta(1/2) / sqrt(2 pi)
+    beta = 0.5826
+
+    def __init__(self, dt=0.01, stdev_dampening=20, low_first_probability=0.5, discrete_correction=True):
+        """
+        :param dt: Time step of the path the model stands in for
+        :param stdev_dampening: The standard deviation of the steps is the standard deviation of the bar prices divided
+        by stdev_dampening, as in simulate_intrabar_data
+        :param low_first_probability: Probability that the low of a bar comes before the high
+        :param discrete_correction: If True, the fill price is corrected for the overshoot of a path in discrete steps
+        """
+        self.dt = dt
+        self.stdev_dampening = stdev_dampening
+        self.low_first_probability = low_first_probability
+        self.discrete_correction = discrete_correction
+
+    def fill(self, bars, limit_prices, sides, total_ts, tickers=None):
+        opens = np.array([bar.open for bar in bars], dtype=float)
+        highs = np.array([bar.high for bar in bars], dtype=float)
+        lows = np.array([bar.low for bar in bars], dtype=float)
+        closes = np.array([bar.close for bar in bars], dtype=float)
+        limit_prices = np.asarray(limit_prices, dtype=float)
+        sign = np.where(np.asarray(sides) == 'buy', 1., -1.)
+        steps = np.round(np.asarray(total_ts, dtype=float) / self.dt)
+
+        sigma = np.std(np.stack([lows, highs, closes, opens]), axis=0) / self.stdev_dampening
+        variance = steps * sigma ** 2
+
+        # Mirroring the sell orders to buy orders
+        opens = sign * opens
+        limit_prices = sign * limit_prices
+        lows, highs = np.where(sign > 0, lows, -highs), np.where(sign > 0, highs, -lows)
+
+        above_open = np.maximum(opens - limit_prices, 0.)
+        above_high = highs - limit_prices
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hit_before_high = np.random.random(opens.size) < np.exp(-2 * above_open * above_high / variance)
+            time_before_high = above_open / (above_open + above_high) / 3
+            time_before_low = above_open / (opens - lows) / 3
+            time_after_high = (1 + above_high / (highs - lows)) / 3
+        low_first = np.random.random(opens.size) < self.low_first_probability
+
+        times = np.where(low_first, time_before_low, np.where(hit_before_high, time_before_high, time_after_high))
+
+        prices = limit_prices
+        if self.discrete_correction:
+            prices = np.maximum(prices - self.beta * sigma, lows)
+
+        gap = opens <= limit_prices
+        prices = np.where(gap, opens, prices)
+        times = np.where(gap, 0., times)
+
+        not_filled = limit_prices < lows
+        prices = np.where(not_filled, np.nan, sign * prices)
+        times = np.where(not_filled, np.nan, times)
+        return prices, times
+
+
+class SubBarFillModel(FillModel):
+
+    """
+    Resolving the fills with real bars of a lower timeframe, e.g. 1 minute bars added to the assets with
+    Asset.add_data_series, while the strategies run on the coarse bars.
+
+    The sub bars inside the coarse bar, from its time up to the time of the next coarse bar, are located by bisecting
+    the sorted timestamps of the series. The order is filled at the first sub bar reaching the limit price: at the open of
+    the sub bar if it opens through the limit price, and else at the limit price. If the sub bars never reach the limit
+    price, the order is not filled. Orders on assets without the series, or without sub bars inside the coarse bar, are
+    filled with the fallback model.
+    """
+
+    def __init__(self, context, series: str, fallback: FillModel = None):
+        """
+        :param context: Context object containing all the cogs
+        :param series: Name of the lower timeframe series of the assets
+        :param fallback: FillModel for the orders without sub bars. Defaults to SimulatedPathFillModel
+        """
+        self.context = context
+        self.series = series
+        self.fallback = fallback if fallback is not None else SimulatedPathFillModel()
+
+    def fill(self, bars, limit_prices, sides, total_ts, tickers=None):
+        assert tickers is not None, 'SubBarFillModel needs the tickers of the orders'
+        prices = np.full(len(bars), np.nan)
+        times = np.full(len(bars), np.nan)
+
+        fallback_orders = []
+        for i, (bar, limit_price, side, total_t, ticker) in enumerate(zip(bars, limit_prices, sides, total_ts,
+                                                                           tickers)):
+            sub_bars = self.sub_bars(ticker, bar, total_t)
+            if sub_bars is None:
+                fallback_orders.append(i)
+                continue
+
+            sub_times, opens, highs, lows, end = sub_bars
+            if side == 'buy':
+                crossed = lows <= limit_price
+                through_open = opens <= limit_price
+            else:
+                crossed = highs >= limit_price
+                through_open = opens >= limit_price
+
+            first = np.argmax(crossed)
+            if crossed[first]:
+                prices[i] = opens[first] if through_open[first] else limit_price
+                start = np.datetime64(bar.time, 'us')
+                times[i] = (sub_times[first] - start) / (end - start)
+
+        if fallback_orders:
+            fallback_prices, fallback_times = self.fallback.fill([bars[i] for i in fallback_orders],
+                                                                 [limit_prices[i] for i in fallback_orders],
+                                                                 [sides[i] for i in fallback_orders],
+                                                                 [total_ts[i] for i in fallback_orders],
+                                                                 [tickers[i] for i in fallback_orders])
+            prices[fallback_orders] = fallback_prices
+            times[fallback_orders] = fallback_times
+
+        return prices, times
+
+    def sub_bars(self, ticker, bar, total_t):
+        """
+        :param ticker: Ticker of the asset
+        :param bar: The coarse bar
+        :param total_t: Duration of the coarse bar in days, used if it is the last coarse bar
+        :return: tuple of the times, opens, highs and lows of the sub bars inside the coarse bar (oldest first) and the
+        end time of the coarse bar, or None if there are no sub bars
+        """
+        asset = self.context.assets[ticker]
+        try:
+            series = asset.data[self.series]
+        except KeyError:
+            return None
+        if not isinstance(series, TimeSeries) or not len(series):
+            return None
+
+        start = bar.time
+        end = asset.bars.next_time(asset.bars.count_until(start))
+        if end is None:
+            end = start + timedelta(days=total_t)
+
+        first = series.count_before(start)
+        last = series.count_before(end)
+        if first == last:
+            return None
+
+        # The series is ordered newest first
+        rows = slice(len(series) - last, len(series) - first)
+        if isinstance(series, ColumnarTimeSeries):
+            columns = [series.columns[name][rows][::-1] for name in ('time', 'open', 'high', 'low')]
+        else:
+            points = series[rows][::-1]
+            columns = [np.array([p.time for p in points], dtype='datetime64[us]')] + \
+                      [np.array([getattr(p, name) for p in points], dtype=float) for name in ('open', 'high', 'low')]
+
+        return columns[0], columns[1], columns[2], columns[3], np.datetime64(end, 'us')
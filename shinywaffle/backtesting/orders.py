@@ -1,17 +1,28 @@
 from shinywaffle.common.event import events
+from bisect import bisect_left, bisect_right, insort
+import math
 
 
 class OrderBook:
 
+    """
+    Holding the pending orders in a dict by id, so an order is looked up, filled or cancelled in O(1). The pending
+    orders are also indexed by order type (in the order they were placed) and by asset and side, and the limit orders
+    are kept in a LimitBook per asset, sorted by limit price.
+    """
+
     def __init__(self, context):
         self.context = context
         self.latest_id = 0
+        self.orders = dict()
         self.pending_orders = {
-            MarketBuyOrder: [],
-            LimitBuyOrder: [],
-            MarketSellOrder: [],
-            LimitSellOrder: []
+            MarketBuyOrder: dict(),
+            LimitBuyOrder: dict(),
+            MarketSellOrder: dict(),
+            LimitSellOrder: dict()
         }
+        self.asset_orders = dict()
+        self.limit_books = dict()
 
         self.filled_orders = {
             MarketBuyOrder: [],
@@ -19,40 +30,87 @@ class OrderBook:
             MarketSellOrder: [],
             LimitSellOrder: []
         }
-
-    def update_post_event_stack(self):
+        self.cancelled_orders = []
+
+    def update_post_event_stack(self, tickers=None):
+        """
+        The pending market orders are checked one by one, while the pending limit orders of all assets are matched
+        against the new bars in one pass. Only the orders pending when this is called are checked, not the ones placed
+        while handling the events of the step
+        :param tickers: Tickers of the assets with a new bar. If None, the orders of all assets are checked
+        :return: list of a PendingOrderEvent per pending market order and a LimitOrderMatchEvent if there are pending
+        limit orders of the assets
+        """
         pending_order_events = []
-        for type, list in self.pending_orders.items():
-            for o in list:
-                pending_order_events.append(events.PendingOrderEvent(o.id))
+        for type in (MarketBuyOrder, MarketSellOrder):
+            for o in self.pending_orders[type].values():
+                if tickers is None or o.asset.ticker in tickers:
+                    pending_order_events.append(events.PendingOrderEvent(o.id))
+
+        limit_tickers = [ticker for ticker, limit_book in self.limit_books.items()
+                         if limit_book and (tickers is None or ticker in tickers)]
+        if limit_tickers:
+            pending_order_events.append(events.LimitOrderMatchEvent(limit_tickers, self.latest_id))
 
         return pending_order_events
 
     def new_order(self, order):
         order.id = self.latest_id
         self.latest_id += 1
-        self.pending_orders[type(order)].append(order)
+        self.orders[order.id] = order
+        self.pending_orders[type(order)][order.id] = order
+        self.asset_orders.setdefault(order.asset.ticker, {'buy': dict(), 'sell': dict()})[order.side][order.id] = order
+        if isinstance(order, LimitOrder):
+            self.limit_books.setdefault(order.asset.ticker, LimitBook()).add(order)
         return events.PendingOrderEvent(order.id)
 
     def get_by_id(self, order_id):
-        for order_list in self.pending_orders.values():
-            order = [o for o in order_list if o.id == order_id]
-            try:
-                return order[0]
-            except IndexError:
-                continue
+        """
+        :return: The pending order with the id, or None if it is not pending (anymore)
+        """
+        return self.orders.get(order_id)
+
+    def get_by_asset(self, ticker, side=None):
+        """
+        :param ticker: Ticker of the asset
+        :param side: 'buy' or 'sell'. If None, the orders of both sides are returned
+        :return: list of the pending orders of the asset, in the order they were placed
+        """
+        try:
+            asset_orders = self.asset_orders[ticker]
+        except KeyError:
+            return []
+
+        if side is not None:
+            return list(asset_orders[side].values())
+        return sorted(list(asset_orders['buy'].values()) + list(asset_orders['sell'].values()), key=lambda o: o.id)
+
+    def remove(self, order):
+        del self.orders[order.id]
+        del self.pending_orders[type(order)][order.id]
+        del self.asset_orders[order.asset.ticker][order.side][order.id]
+        if isinstance(order, LimitOrder):
+            self.limit_books[order.asset.ticker].remove(order)
+
+    def cancel_order(self, order_id):
+        """
+        Cancelling a pending order
+        :return: The cancelled order, or None if the order is not pending
+        """
+        order = self.orders.get(order_id)
+        if order is not None:
+            self.remove(order)
+            self.cancelled_orders.append(order)
+        return order
 
     def fill_order(self, pending_order_id, price, size, commission):
-        order = self.get_by_id(pending_order_id)
+        order = self.orders[pending_order_id]
         order.filled_price = price
         order.size = size
         order.commission = commission
 
-        for idx, o in enumerate(self.pending_orders[type(order)]):
-            if o.id == pending_order_id:
-                filled_order = self.pending_orders[type(order)].pop(idx)
-                self.filled_orders[type(order)].append(filled_order)
-                break
+        self.remove(order)
+        self.filled_orders[type(order)].append(order)
 
         return events.OrderFilledEvent(order.asset,
                                        order.filled_price,
@@ -64,7 +122,55 @@ class OrderBook:
                                        self.context.retrieved_data.time)
 
 
+class LimitBook:
+
+    """
+    The pending limit orders of one asset. The buy and the sell side are each a list of (limit price, id, order) kept
+    sorted by limit price, so the orders with a limit price inside a bar are found with two binary searches.
+    """
+
+    def __init__(self):
+        self.sides = {'buy': [], 'sell': []}
+
+    def __len__(self):
+        return len(self.sides['buy']) + len(self.sides['sell'])
+
+    def add(self, order):
+        insort(self.sides[order.side], (order.order_limit_price, order.id, order))
+
+    def remove(self, order):
+        side = self.sides[order.side]
+        idx = bisect_left(side, (order.order_limit_price, order.id))
+        assert side[idx][2] is order
+        del side[idx]
+
+    def in_range(self, low, high, side=None):
+        """
+        :param low: Lowest limit price
+        :param high: Highest limit price
+        :param side: 'buy' or 'sell'. If None, the orders of both sides are returned
+        :return: list of the orders with low <= limit price <= high, the buy orders first and each side sorted by limit
+        price
+        """
+        orders = []
+        for side_name in (('buy', 'sell') if side is None else (side,)):
+            side_orders = self.sides[side_name]
+            start = bisect_left(side_orders, (low,))
+            end = bisect_right(side_orders, (high, math.inf))
+            orders += [entry[2] for entry in side_orders[start:end]]
+        return orders
+
+
 class Order:
+
+    """
+    Order base class. The orders use __slots__ to keep them small, so each order class lists the attributes it sets.
+    The mixin classes (MarketOrder, BuyOrder etc.) have empty slots and their attributes are listed by the order
+    classes using them.
+    """
+
+    __slots__ = ('id', 'asset', 'volume', 'time', 'filled_price', 'size', 'commission')
+
     def __init__(self, asset, volume, time):
         self.id = None
         self.asset = asset
@@ -76,27 +182,37 @@ class Order:
 
 
 class MarketOrder:
+    __slots__ = ()
+
     def __init__(self):
         self.type = 'market'
 
 
 class LimitOrder:
+    __slots__ = ()
+
     def __init__(self, limit_price):
         self.type = 'limit'
         self.order_limit_price = limit_price
 
 
 class BuyOrder:
+    __slots__ = ()
+
     def __init__(self):
         self.side = 'buy'
 
 
 class SellOrder:
+    __slots__ = ()
+
     def __init__(self):
         self.side = 'sell'
 
 
 class MarketBuyOrder(Order, MarketOrder, BuyOrder):
+    __slots__ = ('type', 'side')
+
     def __init__(self, asset, volume, time):
         Order.__init__(self, asset, volume, time)
         MarketOrder.__init__(self)
@@ -104,6 +220,8 @@ class MarketBuyOrder(Order, MarketOrder, BuyOrder):
 
 
 class MarketSellOrder(Order, MarketOrder, SellOrder):
+    __slots__ = ('type', 'side')
+
     def __init__(self, asset, volume, time):
         Order.__init__(self, asset, volume, time)
         MarketOrder.__init__(self)
@@ -111,6 +229,8 @@ class MarketSellOrder(Order, MarketOrder, SellOrder):
 
 
 class LimitBuyOrder(Order, LimitOrder, BuyOrder):
+    __slots__ = ('type', 'order_limit_price', 'side')
+
     def __init__(self, asset, volume, limit_price, time):
         Order.__init__(self, asset, volume, time)
         LimitOrder.__init__(self, limit_price)
@@ -118,6 +238,8 @@ class LimitBuyOrder(Order, LimitOrder, BuyOrder):
 
 
 class LimitSellOrder(Order, LimitOrder, SellOrder):
+    __slots__ = ('type', 'order_limit_price', 'side')
+
     def __init__(self, asset, volume, limit_price, time):
         Order.__init__(self, asset, volume, time)
         LimitOrder.__init__(self, limit_price)
@@ -185,7 +185,7 @@ class BacktestWorkflow:
                     new_context.broker.slippages = abs(np.random.normal(0, 0.05, 100000)).tolist()
 
                     new_backtester = Backtester(new_context, self._backtester.time_increment, backtest_from,
-                                                backtest_to, path, name)
+                                                backtest_to, path, name, self._backtester.timeline)
 
                     # Append to list of backtests
                     self.backtests.append(BacktestContainer(name, params, new_backtester,
@@ -156,7 +156,7 @@ class Account:
         for ticker, asset in self.assets.items():
             # asset['asset_data'].latest_bar = self.context.retrieved_data[ticker]['bars'][0]
             try:
-                asset['value'] = asset['holding'] * self.context.retrieved_data[ticker]['bars'][0].close
+                asset['value'] = asset['holding'] * self.context.retrieved_data[ticker]['bars'].close[0]
             except TypeError:
                 # Catching None
                 asset['value'] = 0
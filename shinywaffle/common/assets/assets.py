@@ -46,17 +46,18 @@ class Asset:
         assert isinstance(bars, TimeSeries) or isinstance(bars, APILink)
         self.bars = bars
 
-    def add_data_series(self, name, data_series):
+    def add_data_series(self, name, data_series, interval=None):
 
         """
         Method to add data series to the financial asset. Data series represent time series data like price data
         or sentiment data
         :param name: Name to be referenced
-        :param data_series: DataSeries object
+        :param data_series: DataSeries object, or an APILink for live data
+        :param interval: Optional interval of the data series, e.g. '1min' or 'daily'
         """
 
-        assert isinstance(data_series, TimeSeries)
-        self.data.add(data_series, name)
+        assert isinstance(data_series, TimeSeries) or isinstance(data_series, APILink)
+        self.data.add(data_series, name, interval)
 
     def set_stop(self, stop_object):
         if isinstance(stop_object, StopLoss):
@@ -9,11 +9,25 @@ class Context:
 
     def __init__(self):
         from shinywaffle.data.time_series_data import RetrievedTimeSeriesData
+        from shinywaffle.technical_indicators import IndicatorCache
         self.assets = {}
         self.strategies = {}
         self.broker = None
         self.account = None
         self.retrieved_data = RetrievedTimeSeriesData(self)
+        self.indicator_cache = IndicatorCache(self)
+        self.indicator_grids = {}
 
     def copy(self):
-        return copy.deepcopy(self)
+        """
+        Deep copy of the context. The time series of the assets are never modified in a backtest, so they are shared
+        with the copy instead of being copied. So are the indicator grids computed from them, which lets the runs of
+        a workflow look up their windows without recomputing them (see TradingStrategy.grid)
+        """
+        from shinywaffle.data.time_series_data import TimeSeries
+        memo = {id(self.indicator_grids): self.indicator_grids}
+        for asset in self.assets.values():
+            for series in [asset.bars] + [s for _, s in asset.data.time_series()]:
+                if isinstance(series, TimeSeries):
+                    memo[id(series)] = series
+        return copy.deepcopy(self, memo)
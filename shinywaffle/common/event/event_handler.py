@@ -1,4 +1,4 @@
-from shinywaffle.common.event.event_stack import EventStack, PostEventStack
+from shinywaffle.common.event.event_stack import EventQueue
 from shinywaffle.common.event.event_stack import EventStackEmptyError
 from shinywaffle.common.event import events
 import shinywaffle.data.data_provider
@@ -9,6 +9,21 @@ from typing import Type
 
 class EventHandler:
 
+    # Name of the method handling each type of event. Events of other types are ignored
+    handlers = {
+        events.TimeSeriesEvent: 'handle_time_series_events',
+        events.TimeSeriesBatchEvent: 'handle_time_series_batch',
+        events.SignalEventMarketBuy: 'handle_buy_signal',
+        events.SignalEventLimitBuy: 'handle_buy_signal',
+        events.SignalEventMarketSell: 'handle_sell_signal',
+        events.SignalEventLimitSell: 'handle_sell_signal',
+        events.StopLossEvent: 'handle_stop',
+        events.TrailingStopEvent: 'handle_stop',
+        events.PendingOrderEvent: 'handle_pending_order',
+        events.LimitOrderMatchEvent: 'handle_limit_order_match',
+        events.OrderFilledEvent: 'handle_order_filled'
+    }
+
     def __init__(self, context: Context, data_provider: Type[shinywaffle.data.data_provider.DataProvider]):
 
         self.context = context
@@ -16,8 +31,14 @@ class EventHandler:
         self.broker = context.broker
         self.assets = context.assets
         self.data_provider = data_provider
-        self.event_stack = EventStack()
-        self.post_event_stack = PostEventStack()
+        self.event_stack = EventQueue()
+
+        # Binding the handler methods once instead of looking them up for every event
+        self.event_handlers = {event_type: getattr(self, method) for event_type, method in type(self).handlers.items()}
+
+        # Batch strategies are called once per step with all updated assets instead of once per TimeSeriesEvent
+        self.strategies = [s for s in context.strategies.values() if not s.is_batch()]
+        self.batch_strategies = [s for s in context.strategies.values() if s.is_batch()]
 
         while True:
             try:
@@ -26,27 +47,29 @@ class EventHandler:
             except shinywaffle.data.data_provider.BacktestCompleteException:
                 break
             else:
-                self.event_stack.add(new_events)
+                self.event_stack.add(new_events, self.context.retrieved_data.time)
+                self.event_stack.add(self.make_batch_event(new_events))
+
+                # The orders placed in earlier steps are checked against the new bars of their assets. The orders of
+                # assets without a new bar are checked in a later step, and the orders placed in this step are not
+                # checked against the bar the signals were created from
+                tickers = {e.asset.ticker for e in new_events if type(e) == events.TimeSeriesEvent}
+                self.event_stack.add(self.broker.order_book.update_post_event_stack(tickers))
 
-            # Looping over events in event stack and handling them accordingly
+            # Handling the events in the event queue in order, including the events added while handling them
             while True:
                 try:
                     event = self.event_stack.get()
                     self.handle_event(event)
                 except EventStackEmptyError:
-                    self.event_stack.events += self.post_event_stack.dump()
                     break
 
             self.account.update()
-            if not self.event_stack.events and not self.post_event_stack.events:
-                try:
-                    print("Sleeping {} seconds".format(data_provider.sleep_time))
-                    time.sleep(data_provider.sleep_time)
-                except AttributeError:
-                    pass
-                finally:
-                    pending_order_events = self.broker.order_book.update_post_event_stack()
-                    self.event_stack.add(pending_order_events)
+            try:
+                print("Sleeping {} seconds".format(data_provider.sleep_time))
+                time.sleep(data_provider.sleep_time)
+            except AttributeError:
+                pass
 
             try:
                 self.context.progress_bar.update()
@@ -54,45 +77,56 @@ class EventHandler:
                 pass
 
     def handle_event(self, event):
-        if type(event) == events.TimeSeriesEvent:
-            self.handle_time_series_events(event)
-
-        elif type(event) == events.SignalEventMarketBuy:
-            new_event = self.account.place_buy_order(event)
-            self.post_event_stack.add(new_event)
+        handler = self.event_handlers.get(type(event))
+        if handler is not None:
+            handler(event)
 
-        elif type(event) == events.SignalEventLimitBuy:
-            new_event = self.account.place_buy_order(event)
-            self.post_event_stack.add(new_event)
+    def handle_buy_signal(self, event):
+        # The PendingOrderEvent of the new order is not used, the order is checked with the other pending orders when
+        # its asset has a new bar
+        self.account.place_buy_order(event)
 
-        elif type(event) == events.SignalEventMarketSell:
-            new_event = self.account.place_sell_order(event)
-            self.post_event_stack.add(new_event)
+    def handle_sell_signal(self, event):
+        self.account.place_sell_order(event)
 
-        elif type(event) == events.SignalEventLimitSell:
-            new_event = self.account.place_sell_order(event)
-            self.post_event_stack.add(new_event)
+    def handle_stop(self, event):
+        pass
 
-        elif type(event) == events.StopLossEvent:
-            pass
+    def handle_pending_order(self, event):
+        new_event = self.broker.check_for_order_fill(event.order_id)
+        self.event_stack.add(new_event)
 
-        elif type(event) == events.TrailingStopEvent:
-            pass
+    def handle_limit_order_match(self, event):
+        new_events = self.broker.match_limit_orders(event.tickers, event.latest_id)
+        self.event_stack.add(new_events)
 
-        elif type(event) == events.PendingOrderEvent:
-            new_event = self.broker.check_for_order_fill(event.order_id)
-            self.event_stack.add(new_event)
-
-        elif type(event) == events.OrderFilledEvent:
-            self.account.complete_order(event)
+    def handle_order_filled(self, event):
+        self.account.complete_order(event)
 
     def handle_time_series_events(self, event):
         # Create list of strategy objects that are linked to the asset that have generated the events (same ticker)
         # Loop over the strategies with the generated events and call generate_signal method
         generated_events = []
-        for strategy in self.context.strategies.values():
+        for strategy in self.strategies:
             new_events = strategy.generate_signal(event.asset)
             generated_events += new_events
 
         self.event_stack.add(generated_events)
 
+    def make_batch_event(self, new_events):
+        """
+        :param new_events: The events of the data provider
+        :return: A TimeSeriesBatchEvent with all assets that got new data in the step, if there are batch strategies
+        """
+        assets = [e.asset for e in new_events if type(e) == events.TimeSeriesEvent]
+        if self.batch_strategies and assets:
+            return events.TimeSeriesBatchEvent(assets)
+
+    def handle_time_series_batch(self, event):
+        # Calling the batch strategies once with all assets that got new data in the step
+        generated_events = []
+        for strategy in self.batch_strategies:
+            generated_events += strategy.generate_signals(event.assets)
+
+        self.event_stack.add(generated_events)
+
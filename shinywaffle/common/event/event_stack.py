@@ -1,4 +1,6 @@
 from shinywaffle.common.event import events
+from datetime import datetime
+import heapq
 
 
 class EventStack:
@@ -8,6 +10,25 @@ class EventStack:
 
     """
 
+    # Counter incremented when an event of each type is popped from the stack
+    counters = {
+        events.TimeSeriesEvent: 'time series',
+        events.SignalEventMarketBuy: 'market buy signal',
+        events.SignalEventMarketSell: 'market sell signal',
+        events.SignalEventLimitBuy: 'limit buy signal',
+        events.SignalEventLimitSell: 'limit sell signal',
+        events.StopLossEvent: 'stop loss',
+        events.TrailingStopEvent: 'trailing stop'
+    }
+
+    # OrderFilledEvents are counted by order type and side, and in 'total filled'
+    filled_counters = {
+        ('market', 'buy'): 'market buy filled',
+        ('market', 'sell'): 'market sell filled',
+        ('limit', 'buy'): 'limit buy filled',
+        ('limit', 'sell'): 'limit sell filled'
+    }
+
     def __init__(self):
 
         """
@@ -17,20 +38,20 @@ class EventStack:
         """
 
         self.events = list()
-        self.past_events = {
-            'time series': 0,
-            'market buy signal': 0,
-            'market sell signal': 0,
-            'limit buy signal': 0,
-            'limit sell signal': 0,
-            'market buy filled': 0,
-            'market sell filled': 0,
-            'limit buy filled': 0,
-            'limit sell filled': 0,
-            'total filled': 0,
-            'stop loss': 0,
-            'trailing stop': 0
-        }
+        self.past_events = dict.fromkeys([
+            'time series',
+            'market buy signal',
+            'market sell signal',
+            'limit buy signal',
+            'limit sell signal',
+            'market buy filled',
+            'market sell filled',
+            'limit buy filled',
+            'limit sell filled',
+            'total filled',
+            'stop loss',
+            'trailing stop'
+        ], 0)
 
     def add(self, event):
         """
@@ -62,52 +83,97 @@ class EventStack:
         """
         try:
             event = self.events.pop()
-
-            if type(event) == events.TimeSeriesEvent:
-                self.past_events['time series'] += 1
-            elif type(event) == events.SignalEventMarketBuy:
-                self.past_events['market buy signal'] += 1
-            elif type(event) == events.SignalEventMarketSell:
-                self.past_events['market sell signal'] += 1
-            elif type(event) == events.SignalEventLimitBuy:
-                self.past_events['limit buy signal'] += 1
-            elif type(event) == events.SignalEventLimitSell:
-                self.past_events['limit sell signal'] += 1
-            elif type(event) == events.OrderFilledEvent:
-                if event.type == 'market':
-                    if event.side == 'sell':
-                        self.past_events['market sell filled'] += 1
-                    elif event.side == 'buy':
-                        self.past_events['market buy filled'] += 1
-                elif event.type == 'limit':
-                    if event.side == 'sell':
-                        self.past_events['limit sell filled'] += 1
-                    elif event.side == 'buy':
-                        self.past_events['limit buy filled'] += 1
-            elif type(event) == events.StopLossEvent:
-                self.past_events['stop loss'] += 1
-            elif type(event) == events.TrailingStopEvent:
-                self.past_events['trailing stop'] += 1
-            elif type(event) == events.OrderFilledEvent:
-                self.past_events['total filled'] += 1
-
-            return event
         except IndexError:
             raise EventStackEmptyError
 
+        self.count(event)
+        return event
+
+    def count(self, event):
+        """
+        Incrementing the counter of the event type in self.past_events
+        """
+        counter = EventStack.counters.get(type(event))
+        if counter is not None:
+            self.past_events[counter] += 1
+        elif type(event) == events.OrderFilledEvent:
+            counter = EventStack.filled_counters.get((event.type, event.side))
+            if counter is not None:
+                self.past_events[counter] += 1
+            self.past_events['total filled'] += 1
+
     def report(self):
         return self.past_events
 
 
-class PostEventStack(EventStack):
+class EventQueue(EventStack):
+
+    """
+    Event queue ordered by (timestamp, priority, sequence number), kept as a heap so adding an event is O(log n).
+
+    The timestamp is the time of the step the event was added in, so events left over from an earlier step are
+    handled first. Within a step, fills are handled before stops, new data, signals and finally the pending orders.
+    Events with the same timestamp and priority are handled in the order they were added.
+    """
+
+    priorities = {
+        events.OrderFilledEvent: 0,
+        events.StopLossEvent: 1,
+        events.TrailingStopEvent: 1,
+        events.TimeSeriesEvent: 2,
+        events.TimeSeriesBatchEvent: 2,
+        events.SignalEventMarketBuy: 3,
+        events.SignalEventMarketSell: 3,
+        events.SignalEventLimitBuy: 3,
+        events.SignalEventLimitSell: 3,
+        events.PendingOrderEvent: 4,
+        events.LimitOrderMatchEvent: 4
+    }
+
+    default_priority = 5
 
     def __init__(self):
         super().__init__()
+        self.sequence = 0
+        self.time = datetime.min
+
+    def add(self, event, time=None):
+        """
+        Adding an event or a list of events to the queue
+        :param event: can either be an event or list of events
+        :param time: Timestamp of the events. Defaults to the latest timestamp added
+        :return: N/A
+        """
+        if time is not None:
+            self.time = time
+
+        if isinstance(event, list):
+            for e in event:
+                if e is not None:
+                    self.push(e)
+        elif event is not None:
+            self.push(event)
+
+    def push(self, event):
+        priority = EventQueue.priorities.get(type(event), EventQueue.default_priority)
+        heapq.heappush(self.events, (self.time, priority, self.sequence, event))
+        self.sequence += 1
+
+    def get(self):
+        """
+        Method that pops the first event in the queue and returns it. Increments the appropriate event type in
+        self.past_events dictionary.
+        Raises EventStackEmptyError if the queue is empty
+
+        :return: event
+        """
+        try:
+            event = heapq.heappop(self.events)[3]
+        except IndexError:
+            raise EventStackEmptyError
 
-    def dump(self):
-        events = self.events
-        self.events = []
-        return events
+        self.count(event)
+        return event
 
 
 class EventStackEmptyError(Exception):
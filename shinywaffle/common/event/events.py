@@ -1,15 +1,25 @@
 from shinywaffle.common.assets import assets
 
+# The type of the asset is checked whenever an event is created. Set events.validate = False to skip the check in long
+# backtests creating millions of events (running Python with -O skips it as well)
+validate = True
+
 
 class Event:
 
     """
     Event base class is used as super for all other classes
     Classes for the different types of events
+
+    The events use __slots__ to keep them small, so each class lists the attributes it sets. The mixin classes
+    (BuyEvent, MarketEvent etc.) have empty slots and their attributes are listed by the event classes using them.
     """
 
+    __slots__ = ('asset',)
+
     def __init__(self, asset):
-        assert isinstance(asset, assets.Asset)
+        if validate:
+            assert isinstance(asset, assets.Asset)
         self.asset = asset
 
     def __str__(self):
@@ -17,32 +27,56 @@ class Event:
 
 
 class BuyEvent:
+    __slots__ = ()
+
     def __init__(self):
         self.side = 'buy'
 
 
 class SellEvent:
+    __slots__ = ()
+
     def __init__(self):
         self.side = 'sell'
 
 
 class MarketEvent:
+    __slots__ = ()
+
     def __init__(self):
         self.type = 'market'
 
 
 class LimitEvent:
+    __slots__ = ()
+
     def __init__(self, limit_price):
         self.type = 'limit'
         self.order_limit_price = limit_price
 
 
 class TimeSeriesEvent(Event):
+    __slots__ = ()
+
     def __init__(self, asset):
         super().__init__(asset)
 
 
+class TimeSeriesBatchEvent:
+
+    """
+    All assets that got new data in a step, for the strategies generating the signals of all assets in one call
+    """
+
+    __slots__ = ('assets',)
+
+    def __init__(self, assets):
+        self.assets = assets
+
+
 class SignalEventMarketBuy(Event, MarketEvent, BuyEvent):
+    __slots__ = ('type', 'side', 'order_volume')
+
     def __init__(self, asset, order_volume):
         Event.__init__(self, asset)
         MarketEvent.__init__(self)
@@ -51,6 +85,8 @@ class SignalEventMarketBuy(Event, MarketEvent, BuyEvent):
 
 
 class SignalEventLimitBuy(Event, LimitEvent, BuyEvent):
+    __slots__ = ('type', 'order_limit_price', 'side', 'order_volume')
+
     def __init__(self, asset, order_volume, order_limit_price):
         Event.__init__(self, asset)
         LimitEvent.__init__(self, order_limit_price)
@@ -59,6 +95,8 @@ class SignalEventLimitBuy(Event, LimitEvent, BuyEvent):
 
 
 class SignalEventMarketSell(Event, MarketEvent, SellEvent):
+    __slots__ = ('type', 'side', 'order_volume')
+
     def __init__(self, asset, order_volume):
         Event.__init__(self, asset)
         MarketEvent.__init__(self)
@@ -67,6 +105,8 @@ class SignalEventMarketSell(Event, MarketEvent, SellEvent):
 
 
 class SignalEventLimitSell(Event, LimitEvent, SellEvent):
+    __slots__ = ('type', 'order_limit_price', 'side', 'order_volume')
+
     def __init__(self, asset, order_volume, order_limit_price):
         Event.__init__(self, asset)
         LimitEvent.__init__(self, order_limit_price)
@@ -75,23 +115,45 @@ class SignalEventLimitSell(Event, LimitEvent, SellEvent):
 
 
 class StopLossEvent(Event):
+    __slots__ = ('order_size',)
+
     def __init__(self, asset, order_size):
         super().__init__(asset)
         self.order_size = order_size
 
 
 class TrailingStopEvent(Event):
+    __slots__ = ('order_size',)
+
     def __init__(self, asset, order_size):
         super().__init__(asset)
         self.order_size = order_size
 
 
 class PendingOrderEvent:
+    __slots__ = ('order_id',)
+
     def __init__(self, order_id):
         self.order_id = order_id
 
 
+class LimitOrderMatchEvent:
+
+    """
+    Matching the pending limit orders of the assets with a new bar against their latest bars. Only the orders with an
+    id below latest_id, i.e. the orders placed before the event was created, are matched
+    """
+
+    __slots__ = ('tickers', 'latest_id')
+
+    def __init__(self, tickers=None, latest_id=None):
+        self.tickers = tickers
+        self.latest_id = latest_id
+
+
 class OrderFilledEvent(Event):
+    __slots__ = ('price', 'order_size', 'type', 'side', 'order_volume', 'commission', 'time')
+
     def __init__(self, asset, price, size, volume, type, side, commission, time):
         super().__init__(asset)
         self.price = price
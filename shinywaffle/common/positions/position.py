@@ -6,6 +6,9 @@ class Position:
 
     Transaction = namedtuple("Transaction", ["volume", "price", "size", "time"])
 
+    __slots__ = ('opened', 'asset', 'id', 'volume', 'volume_remaining', 'size', 'enter_price', 'partial_closed_amount',
+                 'closed', 'close_price', 'is_active', 'time_in_trade', 'time_series', 'transactions')
+
     def __init__(self, time_opened: datetime, asset, volume: float, size: float, price: float):
         self.opened = time_opened
         self.asset = asset
@@ -65,7 +68,7 @@ class Position:
         :param retrieved_data: Time series data object received by the data provider
         """
 
-        close_price = retrieved_data[self.asset.ticker]['bars'][0].close
+        close_price = retrieved_data[self.asset.ticker]['bars'].close[0]
         current_time = retrieved_data.time
         remaining_value = self.volume_remaining * close_price
 
@@ -1,32 +1,131 @@
+import os
 import pandas as pd
-from shinywaffle.data.bar import Bar
-from shinywaffle.data.time_series_data import TimeSeries
+import numpy as np
 from datetime import datetime
+from shinywaffle.data.time_series_data import time_series_from_columns, sort_columns
 
 
 class BarProvider:
 
-    def __new__(cls, path: str, date_string_format: str):
-        bars = list()
-        df = pd.read_csv(path)
-
-        assert 'Open' in df.columns
-        assert 'Close' in df.columns
-        assert 'High' in df.columns
-        assert 'Low' in df.columns
-        assert 'Volume' in df.columns
-        assert 'Date' in df.columns
-
-        for index, row in df.iterrows():
-            bar = Bar(datetime.strptime(row["Date"], date_string_format),
-                      row['Open'],
-                      row['Close'],
-                      row['High'],
-                      row['Low'],
-                      row['Volume'])
-            bars.append(bar)
-
-        bars.sort(key=lambda b: b.time, reverse=True)
-        time_series = TimeSeries()
-        time_series.set(bars)
-        return time_series
+    """
+    Reading bars from a file. The format is given by the file extension: .csv, .parquet, .feather or .npz.
+    All formats use the columns Date, Open, Close, High, Low and Volume.
+
+    If date_from / date_to are given, only the bars inside that range are loaded. Parquet files are read with a row
+    group filter and Feather files are memory-mapped and filtered before they are converted, so the bars outside the
+    range are never materialised. The Date column has to be stored as a timestamp for this. NPZ files are sliced by
+    the Date array before the other columns are converted, and CSV files are filtered after parsing.
+    """
+
+    readers = {
+        '.csv': 'read_csv',
+        '.parquet': 'read_parquet',
+        '.feather': 'read_feather',
+        '.npz': 'read_npz'
+    }
+
+    def __new__(cls, path: str, date_string_format: str = None, columnar: bool = False, cache=None,
+                date_from: datetime = None, date_to: datetime = None):
+        """
+        :param path: Path to the file with the bar data
+        :param date_string_format: Format of the dates in the Date column, if they are stored as strings
+        :param columnar: If True, the bars are stored in a ColumnarTimeSeries
+        :param cache: Optional DataCache. The parsed bars are loaded from it if the file has not changed
+        :param date_from: Optional datetime of the first bar to load
+        :param date_to: Optional datetime of the last bar to load
+        :return: TimeSeries object with the bars sorted newest first
+        """
+        extension = os.path.splitext(path)[1].lower()
+        assert extension in BarProvider.readers, "Unsupported bar file format {}".format(extension)
+
+        options = {'reader': 'BarProvider', 'date_string_format': date_string_format,
+                   'date_from': str(date_from), 'date_to': str(date_to)}
+        columns = cache.load(path, options) if cache is not None else None
+
+        if columns is None:
+            df = getattr(BarProvider, BarProvider.readers[extension])(path, date_from, date_to)
+
+            assert 'Open' in df.columns
+            assert 'Close' in df.columns
+            assert 'High' in df.columns
+            assert 'Low' in df.columns
+            assert 'Volume' in df.columns
+            assert 'Date' in df.columns
+
+            # Parsing whole columns instead of row by row
+            if pd.api.types.is_datetime64_any_dtype(df['Date']):
+                times = df['Date']
+            else:
+                times = pd.to_datetime(df['Date'], format=date_string_format)
+
+            mask = np.ones(len(df), dtype=bool)
+            if date_from is not None:
+                mask &= (times >= date_from).to_numpy()
+            if date_to is not None:
+                mask &= (times <= date_to).to_numpy()
+
+            columns = sort_columns({
+                'time': times.to_numpy()[mask],
+                'open': df['Open'].to_numpy(dtype=float)[mask],
+                'close': df['Close'].to_numpy(dtype=float)[mask],
+                'high': df['High'].to_numpy(dtype=float)[mask],
+                'low': df['Low'].to_numpy(dtype=float)[mask],
+                'volume': df['Volume'].to_numpy(dtype=float)[mask].astype(np.int64)
+            })
+
+            if cache is not None:
+                cache.store(path, options, columns)
+
+        return time_series_from_columns(columns, columnar)
+
+    @staticmethod
+    def read_csv(path, date_from, date_to):
+        return pd.read_csv(path)
+
+    @staticmethod
+    def read_parquet(path, date_from, date_to):
+        """
+        Reading a Parquet file. Row groups outside the date range are skipped using the column statistics.
+        Requires pyarrow.
+        """
+        filters = []
+        if date_from is not None:
+            filters.append(('Date', '>=', pd.Timestamp(date_from)))
+        if date_to is not None:
+            filters.append(('Date', '<=', pd.Timestamp(date_to)))
+        return pd.read_parquet(path, filters=filters or None)
+
+    @staticmethod
+    def read_feather(path, date_from, date_to):
+        """
+        Reading a memory-mapped Feather file. The rows outside the date range are filtered out before the table is
+        converted to a DataFrame. Requires pyarrow.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from pyarrow import feather
+
+        table = feather.read_table(path, memory_map=True)
+        date_type = table.schema.field('Date').type
+        if date_from is not None:
+            table = table.filter(pc.greater_equal(table['Date'], pa.scalar(pd.Timestamp(date_from), date_type)))
+        if date_to is not None:
+            table = table.filter(pc.less_equal(table['Date'], pa.scalar(pd.Timestamp(date_to), date_type)))
+        return table.to_pandas()
+
+    @staticmethod
+    def read_npz(path, date_from, date_to):
+        """
+        Reading a NumPy .npz file with one array per column. If the Date array is a datetime64 array, the other
+        arrays are sliced to the date range before they are converted.
+        """
+        with np.load(path, allow_pickle=False) as npz:
+            dates = npz['Date']
+            selection = slice(None)
+            if dates.dtype.kind == 'M':
+                selection = np.ones(dates.size, dtype=bool)
+                if date_from is not None:
+                    selection &= dates >= np.datetime64(date_from)
+                if date_to is not None:
+                    selection &= dates <= np.datetime64(date_to)
+            return pd.DataFrame({name: npz[name][selection] for name in npz.files})
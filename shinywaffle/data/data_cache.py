@@ -0,0 +1,116 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+
+class DataCache:
+
+    """
+    On-disk cache for the columns parsed by the BarProvider and the TimeSeriesDataReader.
+
+    Each entry is a directory with one .npy file per column, so the columns can be memory-mapped when they are loaded
+    instead of being parsed from text again. Entries are keyed by the path, size and modification time of the source
+    file and the parse options, so an entry is rebuilt automatically when the source file changes.
+    """
+
+    version = 1
+
+    def __init__(self, path: str = None):
+        """
+        :param path: Directory holding the cache entries. Defaults to ~/.shinywaffle/cache
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.shinywaffle', 'cache')
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, source_path: str, options: dict) -> str:
+        """
+        :param source_path: Path to the source file
+        :param options: dict with the parse options
+        :return: Name of the cache entry for the current state of the source file
+        """
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        identity = json.dumps([DataCache.version, source_path, stat.st_size, stat.st_mtime_ns, options],
+                              sort_keys=True)
+        digest = hashlib.sha1(identity.encode()).hexdigest()
+        return '{}-{}'.format(os.path.basename(source_path), digest)
+
+    def load(self, source_path: str, options: dict):
+        """
+        :param source_path: Path to the source file
+        :param options: dict with the parse options
+        :return: dict of column name and read-only memory-mapped array, or None if there is no valid entry
+        """
+        entry = os.path.join(self.path, self.key(source_path, options))
+        try:
+            with open(os.path.join(entry, 'columns.json'), 'r') as json_in:
+                names = json.load(json_in)['columns']
+            return {name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r') for name in names}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, source_path: str, options: dict, columns: dict):
+        """
+        Writing the columns to a new cache entry. The entry is written to a temporary directory first and then
+        renamed, so a half written entry is never loaded. An existing entry with the same name (left corrupt, since it
+        could not be loaded) is replaced. The entries of older versions of the source file are removed, while the
+        entries of the current version with other parse options are kept.
+
+        :param source_path: Path to the source file
+        :param options: dict with the parse options
+        :param columns: dict of column name and array
+        """
+        name = self.key(source_path, options)
+        entry = os.path.join(self.path, name)
+        source = self._source_state(source_path)
+        tmp_entry = tempfile.mkdtemp(dir=self.path)
+        for column_name, column in columns.items():
+            np.save(os.path.join(tmp_entry, column_name + '.npy'), np.ascontiguousarray(column))
+
+        with open(os.path.join(tmp_entry, 'columns.json'), 'w') as json_out:
+            json.dump(dict(source, columns=list(columns.keys())), json_out)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Another process stored the same entry in the meantime
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        prefix = os.path.basename(source_path) + '-'
+        for old_entry in os.listdir(self.path):
+            if old_entry.startswith(prefix) and old_entry != name and self._is_stale(old_entry, source):
+                shutil.rmtree(os.path.join(self.path, old_entry), ignore_errors=True)
+
+    @staticmethod
+    def _source_state(source_path):
+        """
+        :return: dict with the absolute path, size and modification time of the source file
+        """
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        return {'source': source_path, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def _is_stale(self, entry, source):
+        """
+        :return: True if the entry was stored for the same source file, but for another size or modification time
+        """
+        try:
+            with open(os.path.join(self.path, entry, 'columns.json'), 'r') as json_in:
+                entry_source = json.load(json_in)
+        except (OSError, ValueError):
+            return False
+        return entry_source.get('source') == source['source'] and \
+            (entry_source.get('size'), entry_source.get('mtime')) != (source['size'], source['mtime'])
+
+    def clear(self):
+        """
+        Removing all cache entries
+        """
+        for entry in os.listdir(self.path):
+            shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
@@ -1,7 +1,12 @@
+import heapq
+import logging
 from shinywaffle.tools.api_link import APILink
 from shinywaffle.common.event.events import TimeSeriesEvent
+from shinywaffle.data.time_series_data import TimeSeriesView, BoundedTimeSeries
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class DataProvider:
 
@@ -18,46 +23,82 @@ class BacktestDataProvider(DataProvider):
     def __init__(self, context, times: list):
         super().__init__(context)
         self.times = times
+        self.step = 0
+        self.views = None
+        self.schedule = None
         assert isinstance(self.assets, dict)
 
+    def make_schedule(self):
+
+        """
+        Creating the views of the time series data in context.retrieved_data, bounded by the lookback of the
+        strategies, and a heap with the timestamp of the next point of each asset. Only the assets at the top of the
+        heap have to be looked at in a step.
+        """
+
+        self.views = []
+        self.schedule = []
+        for asset_no, asset in enumerate(self.assets.values()):
+            asset_time_series = asset.data.time_series()
+            asset_time_series.append(("bars", asset.bars))
+
+            lookback = self.context.retrieved_data.lookback(asset.ticker)
+            views = []
+            for series in asset_time_series:
+                view = TimeSeriesView(series[1], lookback)
+                self.context.retrieved_data[asset.ticker][series[0]] = view
+                views.append(view)
+
+            self.views.append((asset, views))
+            self.push(asset_no)
+
+    def push(self, asset_no):
+        next_times = [t for t in (view.next_time() for view in self.views[asset_no][1]) if t is not None]
+        if next_times:
+            heapq.heappush(self.schedule, (min(next_times), asset_no))
+
     def retrieve_time_series_data(self):
 
         """
-        Gathering a dictionary of the time series data for all the stocks in the backtester
+        Gathering the time series data for all the stocks in the backtester
         "times" stores the historical report steps generated in the backtester. Every time this method is called,
-        the first item is popped to advance the historical time. When all the items are popped, then the backtest
+        the next item is taken to advance the historical time. When all the items are taken, then the backtest
         stops.
 
-        Creates a dict (time_series_data) which holds the keys 'current time' (popped time) and keys for each ticker
-        of the active assets. Each ticker key is a new dict with the time series data under each key.
+        The views of the assets whose next data point is at or before the new time are popped from the schedule and
+        advanced, so the cost of a step scales with the number of assets that have new data, not the number of assets.
 
-        :return: dict with TimeSeriesEvents for each asset that has seen a new event
+        :return: list with TimeSeriesEvents for each asset that has seen a new event
         """
 
         time_series_events = []
 
         try:
-            new_time = self.times.pop(0)
+            new_time = self.times[self.step]
         except IndexError:
             raise BacktestCompleteException
         else:
+            self.step += 1
+            if self.schedule is None:
+                self.make_schedule()
 
-            for asset in self.assets.values():
-                asset_time_series = asset.data.time_series()
-                asset_time_series.append(("bars", asset.bars))
+            active_assets = []
+            while self.schedule and self.schedule[0][0] <= new_time:
+                active_assets.append(heapq.heappop(self.schedule)[1])
 
-                # Aggregating time series data to be used in event handler
-                retrieved_data = []
-                for series in asset_time_series:
-                    retrieved_data = series[1].retrieve(self.context.retrieved_data.time, new_time)
-                    self.context.retrieved_data[asset.ticker][series[0]].extend(retrieved_data)
+            # Keeping the order of the assets in the context for the events
+            for asset_no in sorted(active_assets):
+                asset, views = self.views[asset_no]
+                retrieved_data = 0
+                for view in views:
+                    retrieved_data += view.advance(new_time)
 
-                # If there are any items in a list consisting of data series elements between the previous time and
-                # the new current time, then add a TimeSeriesEvent and break the loop for that asset
-                for _ in asset_time_series:
-                    if retrieved_data:
-                        time_series_events.append(TimeSeriesEvent(asset))
-                        break
+                # If there are any data series elements between the previous time and the new current time, then add
+                # a TimeSeriesEvent for that asset
+                if retrieved_data:
+                    time_series_events.append(TimeSeriesEvent(asset))
+
+                self.push(asset_no)
 
             self.context.retrieved_data.time = new_time
             return time_series_events
@@ -73,26 +114,46 @@ class LiveDataProvider(DataProvider):
         self.latest_timestamp = datetime(1900, 1, 1)
 
     def retrieve_time_series_data(self):
-        time_series_data = {}
+
+        """
+        Fetching the latest data for all the assets and adding the new points to context.retrieved_data. Each asset
+        and series is held in a BoundedTimeSeries, so only the lookback declared by the strategies is kept in memory.
+
+        The fetched data is no longer returned next to the events, as it used to be in a tuple (events, data). It is
+        read from context.retrieved_data, like in a backtest, and the event handler takes the list of events from
+        both data providers.
+
+        :return: list with TimeSeriesEvents for each asset that has seen a new bar
+        """
+
         time_series_events = []
 
         for asset in self.assets.values():
-            time_series_data[asset.ticker] = {}
-            avail_series = [(s, getattr(asset.data, s)) for s in dir(asset.data) if isinstance(getattr(asset.data, s), APILink)]
+            avail_series = [(e.name, e.series) for e in asset.data.entries() if isinstance(e.series, APILink)]
+            avail_series.append(('bars', asset.bars))
             for series in avail_series:
-                time_series_data[asset.ticker][series[0]] = series[1].fetch()
-
-            time_series_data[asset.ticker]['bars'] = asset.bars.fetch()
+                if series[0] not in self.context.retrieved_data[asset.ticker]:
+                    lookback = self.context.retrieved_data.lookback(asset.ticker)
+                    self.context.retrieved_data[asset.ticker][series[0]] = BoundedTimeSeries(lookback)
+
+                retrieved_series = self.context.retrieved_data[asset.ticker][series[0]]
+                fetched = series[1].fetch()
+                if len(retrieved_series) == 0:
+                    retrieved_series.extend(fetched)
+                else:
+                    latest = retrieved_series.sorted_times()[-1]
+                    retrieved_series.extend(fetched.retrieve(latest, fetched.sorted_times()[-1]))
 
             # Add new time series event only if a fresh bar has been found
             # TODO: Verify if this really makes sense
-            if time_series_data[asset.ticker]['bars'][0].time != self.latest_timestamp:
-                print("New bar observed. Creating time series event...")
+            latest_bar_time = self.context.retrieved_data[asset.ticker]['bars'][0].time
+            if latest_bar_time != self.latest_timestamp:
+                logger.debug('New bar of %s at %s', asset.ticker, latest_bar_time)
                 time_series_events.append(TimeSeriesEvent(asset))
 
-            self.latest_timestamp = time_series_data[asset.ticker]['bars'][0].time
-            time_series_data['current time'] = time_series_data[asset.ticker]['bars'][0].time
-        return time_series_events, time_series_data
+            self.latest_timestamp = latest_bar_time
+            self.context.retrieved_data.time = latest_bar_time
+        return time_series_events
 
 
 class BacktestCompleteException(Exception):
@@ -76,4 +76,98 @@ def simulate_intrabar_data(bar, total_t, dt=0.01, stdev_dampening=20, sigma=None
         s += interp_price_with_noise(s_start, s_end, dt, total_t, sigma, constraints)
 
     s.append(bar.close)
-    return s
\ No newline at end of file
+    return s
+
+
+def simulate_intrabar_paths(opens, highs, lows, closes, total_t, dt=0.01, stdev_dampening=20, sigma=None):
+    """
+    NumPy version of simulate_intrabar_data generating the paths of many bars at once, one row per bar.
+
+    Like simulate_intrabar_data, each path goes from the open to the low and the high (the order is random) and to the
+    close in three segments of round(total_t/dt) steps. Each segment is the straight line between its end points plus
+    a Brownian bridge made from the cumulative sum of normal steps, so the end points are hit exactly. Instead of
+    pushing the price back step by step, the path is reflected into [low, high] as a whole.
+
+    :param opens: array of the bar opens
+    :param highs: array of the bar highs
+    :param lows: array of the bar lows
+    :param closes: array of the bar closes
+    :param total_t: Duration of the bars
+    :param dt: Time step
+    :param stdev_dampening: The standard deviation of the steps is the standard deviation of the bar prices divided by
+    stdev_dampening
+    :param sigma: Optional standard deviation of the steps, overriding the one given by the bar prices
+    :return: array of shape (number of bars, 3 * round(total_t/dt) + 1)
+    """
+    opens = np.atleast_1d(np.asarray(opens, dtype=float))
+    highs = np.atleast_1d(np.asarray(highs, dtype=float))
+    lows = np.atleast_1d(np.asarray(lows, dtype=float))
+    closes = np.atleast_1d(np.asarray(closes, dtype=float))
+    n_bars = opens.size
+    n = round(total_t/dt)
+    assert n > 0, 'total_t has to be at least dt'
+
+    if not sigma:
+        sigma = np.std(np.stack([lows, highs, closes, opens]), axis=0) / stdev_dampening
+    sigma = np.broadcast_to(sigma, (n_bars,))
+
+    # End points of the three segments. The low comes before the high in half of the bars
+    low_first = np.random.random(n_bars) < 0.5
+    anchors = np.stack([opens,
+                        np.where(low_first, lows, highs),
+                        np.where(low_first, highs, lows),
+                        closes], axis=1)
+
+    fraction = np.arange(n) / n
+    lines = anchors[:, :-1, None] + (anchors[:, 1:, None] - anchors[:, :-1, None]) * fraction
+
+    steps = np.random.normal(0., 1., (n_bars, 3, n)) * sigma[:, None, None]
+    walk = np.cumsum(steps, axis=2) - steps
+    bridges = walk - fraction * (walk[:, :, -1:] + steps[:, :, -1:])
+
+    # Reflecting the path into [low, high]
+    paths = lines.reshape(n_bars, 3 * n) + bridges.reshape(n_bars, 3 * n)
+    lows = lows[:, None]
+    ranges = highs[:, None] - lows
+    with np.errstate(divide='ignore', invalid='ignore'):
+        folded = np.mod(paths - lows, 2 * ranges)
+    folded = np.where(folded > ranges, 2 * ranges - folded, folded)
+    paths = np.where(ranges > 0, lows + folded, lows)
+
+    # The reflection is exact up to rounding, so the end points are set again
+    paths[:, ::n] = anchors[:, :-1]
+
+    return np.concatenate([paths, closes[:, None]], axis=1)
+
+
+def simulate_intrabar_array(bar, total_t, dt=0.01, stdev_dampening=20, sigma=None):
+    """
+    NumPy version of simulate_intrabar_data for a single bar
+    :return: 1D array of the simulated prices
+    """
+    return simulate_intrabar_paths(bar.open, bar.high, bar.low, bar.close, total_t, dt, stdev_dampening, sigma)[0]
+
+
+def first_crossing(paths, limit_prices, sides):
+    """
+    Finding the first price of each path that reaches the limit price, with one vectorized search over all paths.
+    A buy limit is reached by a price equal to or below the limit price and a sell limit by a price equal to or above it
+
+    :param paths: array of shape (number of paths, number of prices), or a 1D array for a single path
+    :param limit_prices: Limit price of each path
+    :param sides: 'buy' or 'sell', or one of them per path
+    :return: tuple of an array with the index of the first crossing and an array with the price at it. The index is -1
+    and the price is nan for the paths never reaching the limit price
+    """
+    paths = np.atleast_2d(paths)
+    limit_prices = np.broadcast_to(np.asarray(limit_prices, dtype=float), (paths.shape[0],))[:, None]
+    buy = np.broadcast_to(np.asarray(sides) == 'buy', (paths.shape[0],))[:, None]
+
+    crossed = np.where(buy, paths <= limit_prices, paths >= limit_prices)
+    indices = np.argmax(crossed, axis=1)
+    rows = np.arange(paths.shape[0])
+    hit = crossed[rows, indices]
+
+    indices = np.where(hit, indices, -1)
+    prices = np.where(hit, paths[rows, indices], np.nan)
+    return indices, prices
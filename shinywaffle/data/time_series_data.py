@@ -1,5 +1,9 @@
 import pandas as pd
+import numpy as np
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
 from datetime import datetime
+from shinywaffle.data.bar import Bar
 from shinywaffle.utils.misc import get_datetime_format
 from shinywaffle.common.context import Context
 from _collections import defaultdict
@@ -10,10 +14,16 @@ class DataSeriesContainer:
     """
     A container class for data in an financial instrument class.
 
-    Method: add_time_series: Adds a new time series to the stock object. Asserts that the added time series data is
-            of the type TimeSeriesData
+    The series are kept in an ordered registry of name -> Entry, where each entry holds the series with its interval
+    and column names. Each series is also set as an attribute with its name, and container[name] returns the series
+    like the attribute does. The entry itself is returned by entry(name).
+
+    Method: add: Adds a new time series to the stock object. Asserts that the added time series data is
+            of the type TimeSeries (or a link to an API that can be fetched)
     """
 
+    Entry = namedtuple("Entry", ["name", "series", "interval", "columns"])
+
     intervals = ('1min', '1m',
                  '3min', '3m',
                  '5min', '5m',
@@ -22,23 +32,57 @@ class DataSeriesContainer:
                  '60min', '1h',
                  '2h', '4h', '6h', '8h', '12h',
                  'daily', '1d', '3d',
-                 'weekly', '1w'
-                 'monthly', '1M'
+                 'weekly', '1w',
+                 'monthly', '1M',
                  'yearly')
 
     def __init__(self):
-        pass
+        self.registry = dict()
 
-    def add(self, data_source, name):
-        assert isinstance(data_source, TimeSeries)
+    def add(self, data_source, name, interval=None):
+        """
+        :param data_source: TimeSeries object, or an APILink for live data
+        :param name: Name of the series
+        :param interval: Optional interval of the series. Must be one of DataSeriesContainer.intervals
+        """
+        assert isinstance(data_source, TimeSeries) or hasattr(data_source, 'fetch')
+        assert interval is None or interval in DataSeriesContainer.intervals
+        assert name not in vars(self) or name in self.registry, "{} is a reserved name".format(name)
+
+        if isinstance(data_source, ColumnarTimeSeries):
+            columns = tuple(data_source.columns.keys())
+        elif isinstance(data_source, TimeSeries) and len(data_source):
+            columns = tuple(a for a in dir(data_source[0]) if not a.startswith("_")
+                            and not callable(getattr(data_source[0], a)))
+        else:
+            columns = None
+
+        self.registry[name] = DataSeriesContainer.Entry(name, data_source, interval, columns)
         setattr(self, name, data_source)
 
+    def __getitem__(self, name):
+        return self.registry[name].series
+
+    def entry(self, name):
+        """
+        :return: The registry entry of the series, with its interval and column names
+        """
+        return self.registry[name]
+
+    def __len__(self):
+        return len(self.registry)
+
+    def entries(self):
+        """
+        :return: The registry entries in the order the series were added
+        """
+        return list(self.registry.values())
+
     def time_series(self):
         """
-        :return: A list of tuples of the name of the attribute and the attribute object, for all attributes of type
-        TimeSeries
+        :return: A list of tuples of the name and the series, for all registered series of type TimeSeries
         """
-        return [(s, getattr(self, s)) for s in dir(self) if isinstance(getattr(self, s), TimeSeries)]
+        return [(e.name, e.series) for e in self.registry.values() if isinstance(e.series, TimeSeries)]
 
     def __iter__(self):
         for t in self.time_series():
@@ -57,6 +101,7 @@ class TimeSeries:
 
     def __init__(self):
         self.data = list()
+        self._sorted_times = None
 
     def __len__(self):
         return len(self.data)
@@ -69,16 +114,67 @@ class TimeSeries:
             yield d
 
     def extend(self, other):
+        if isinstance(other, TimeSeries):
+            other = list(other)
         if type(other) == list:
             # self.data += other
             other.reverse()
             for data_point in other:
                 self.data.insert(0, data_point)
         if other:
+            self._sorted_times = None
             self.update_attributes(other[0])
 
+    def sorted_times(self):
+        """
+        The timestamps of the series sorted oldest first. They are gathered once and cached until the data changes.
+        :return: list of timestamps, or None if the data is not ordered newest first
+        """
+        if self._sorted_times is None and self.data:
+            key = 'time' if hasattr(self.data[0], 'time') else 'datetime'
+            times = [getattr(d, key) for d in reversed(self.data)]
+            if all(t0 <= t1 for t0, t1 in zip(times, times[1:])):
+                self._sorted_times = times
+        return self._sorted_times
+
+    def count_until(self, to_time: datetime):
+        """
+        :return: The number of data points with time <= to_time, found by bisecting the sorted timestamps
+        """
+        return bisect_right(self.sorted_times(), to_time)
+
+    def count_before(self, to_time: datetime):
+        """
+        :return: The number of data points with time < to_time, found by bisecting the sorted timestamps
+        """
+        return bisect_left(self.sorted_times(), to_time)
+
+    def next_time(self, count: int):
+        """
+        :param count: Number of the oldest points that are already seen
+        :return: The timestamp of the point after the count oldest points, or None if there is no such point
+        """
+        times = self.sorted_times()
+        if times is None or count >= len(times):
+            return None
+        return times[count]
+
+    def times_between(self, from_time: datetime, to_time: datetime):
+        """
+        :return: list of the timestamps where from_time < time <= to_time, oldest first
+        """
+        return list(self.sorted_times()[self.count_until(from_time):self.count_until(to_time)])
+
     def retrieve(self, from_time: datetime, to_time: datetime):
-        return [d for d in self.data if from_time < d.time <= to_time]
+        """
+        Returning the data points where from_time < time <= to_time. The first and last point are located by bisecting
+        the sorted timestamps, so a call only costs O(log n) plus the number of points returned.
+        """
+        if self.sorted_times() is None:
+            return [d for d in self.data if from_time < d.time <= to_time]
+
+        n = len(self)
+        return self.data[n - self.count_until(to_time):n - self.count_until(from_time)]
 
     def set(self, data):
 
@@ -92,6 +188,7 @@ class TimeSeries:
         # from tools.api_link import APILink
         # assert isinstance(data, list) or isinstance(data, APILink)
         self.data = data
+        self._sorted_times = None
         self.update_attributes(self.data[0])
 
     def update_attributes(self, data_point):
@@ -109,6 +206,272 @@ class TimeSeries:
         return [getattr(i, attrib_name) for i in self.data]
 
 
+class ColumnarTimeSeries(TimeSeries):
+
+    """
+    A time series that stores each attribute of its data points (time, open, high, low, close, volume or any DataPoint
+    field) as a contiguous NumPy array instead of keeping a list of Bar / DataPoint objects.
+
+    The items are ordered newest first like in TimeSeries, so series.close[:window] is a zero-copy slice of the
+    latest closing prices. Indexing with an integer builds the Bar / DataPoint object for that row on the fly.
+    """
+
+    def __init__(self, columns=None, point_type=Bar):
+        """
+        :param columns: dict of column name and array. The time column must be called 'time' for bars and 'datetime'
+        for data points
+        :param point_type: The class of the items returned when indexing the series (Bar or DataPoint)
+        """
+        self.point_type = point_type
+        self.time_key = 'time' if point_type is Bar else 'datetime'
+        self.columns = dict()
+        self._sorted_times = None
+        if columns:
+            self.set_columns(columns)
+
+    def __len__(self):
+        try:
+            return self.columns[self.time_key].size
+        except KeyError:
+            return 0
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.point(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('ColumnarTimeSeries index out of range')
+        return self.point(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.point(i)
+
+    def point(self, i):
+        """
+        :param i: Row number
+        :return: The Bar / DataPoint object for row i
+        """
+        values = {name: column[i] for name, column in self.columns.items()}
+        values[self.time_key] = values[self.time_key].item()
+        if self.point_type is Bar:
+            return Bar(values['time'], values['open'], values['close'], values['high'], values['low'],
+                       values['volume'])
+        else:
+            return DataPoint(values)
+
+    def set_columns(self, columns):
+        """
+        Setting the columns of the series and binding each column to an attribute of the same name
+        :param columns: dict of column name and array
+        :return: None
+        """
+        assert self.time_key in columns, "{} column is missing".format(self.time_key)
+        self.columns = {name: np.ascontiguousarray(column) for name, column in columns.items()}
+        self.columns[self.time_key] = self.columns[self.time_key].astype('datetime64[us]', copy=False)
+        assert all(c.size == len(self) for c in self.columns.values()), "All columns must have the same length"
+        self._sorted_times = None
+        for name, column in self.columns.items():
+            setattr(self, name, column)
+
+    def set(self, data):
+        """
+        Converting a list of data points (Bar or DataPoint objects) to columns. The order of the list is kept.
+        :param data: List of data points
+        :return: None
+        """
+        self.point_type = type(data[0])
+        self.time_key = 'time' if self.point_type is Bar else 'datetime'
+        attributes = [a for a in dir(data[0]) if not a.startswith("_") and a not in dir("__builtins__")
+                      and not callable(getattr(data[0], a))]
+        self.set_columns({a: np.array([getattr(d, a) for d in data]) for a in attributes})
+
+    def extend(self, other):
+        """
+        Prepending newer data to the series
+        :param other: A ColumnarTimeSeries with the same columns, newest first
+        :return: None
+        """
+        if not len(other):
+            return
+        if not len(self):
+            self.set_columns(other.columns)
+        else:
+            self.set_columns({name: np.concatenate((other.columns[name], column))
+                              for name, column in self.columns.items()})
+
+    def sorted_times(self):
+        """
+        :return: Contiguous datetime64 array with the timestamps sorted oldest first, or None if the data is not
+        ordered newest first
+        """
+        if self._sorted_times is None and len(self):
+            times = self.columns[self.time_key][::-1].copy()
+            if np.all(times[1:] >= times[:-1]):
+                self._sorted_times = times
+        return self._sorted_times
+
+    def count_until(self, to_time: datetime):
+        return int(np.searchsorted(self.sorted_times(), np.datetime64(to_time, 'us'), side='right'))
+
+    def count_before(self, to_time: datetime):
+        return int(np.searchsorted(self.sorted_times(), np.datetime64(to_time, 'us'), side='left'))
+
+    def next_time(self, count: int):
+        times = self.sorted_times()
+        if times is None or count >= times.size:
+            return None
+        return times[count].item()
+
+    def times_between(self, from_time: datetime, to_time: datetime):
+        return self.sorted_times()[self.count_until(from_time):self.count_until(to_time)].tolist()
+
+    def retrieve(self, from_time: datetime, to_time: datetime):
+        """
+        :return: A ColumnarTimeSeries with the rows where from_time < time <= to_time. The rows are located with
+        np.searchsorted and returned as views of the columns
+        """
+        times = self.sorted_times()
+        if times is None:
+            times = self.columns[self.time_key]
+            mask = (times > np.datetime64(from_time, 'us')) & (times <= np.datetime64(to_time, 'us'))
+            return ColumnarTimeSeries({name: column[mask] for name, column in self.columns.items()}, self.point_type)
+
+        n = times.size
+        start = n - self.count_until(to_time)
+        stop = n - self.count_until(from_time)
+        return ColumnarTimeSeries({name: column[start:stop] for name, column in self.columns.items()},
+                                  self.point_type)
+
+    def update_attributes(self, data_point):
+        pass
+
+    def get(self, attrib_name):
+        """
+        :param attrib_name: name of the column to be fetched
+        :return: The column as a NumPy array
+        """
+        return self.columns[attrib_name]
+
+
+class TimeSeriesView(TimeSeries):
+
+    """
+    A read-only window over the oldest points of a source time series, used for the retrieved data in a backtest.
+    Indexing is newest first like in TimeSeries, so view[0] is the latest point that has been revealed.
+
+    No data is copied. Advancing the view to a new time only moves the end pointer, and data attributes like
+    view.close are slices of the source attributes (zero-copy NumPy views for a ColumnarTimeSeries source).
+    If maxlen is set, only the maxlen latest points are visible.
+    """
+
+    def __init__(self, source: TimeSeries, maxlen: int = None):
+        assert len(source) == 0 or source.sorted_times() is not None, "Source series must be ordered newest first"
+        self.source = source
+        self.maxlen = maxlen
+        self.end = 0
+
+    @property
+    def start(self):
+        """
+        :return: Index of the newest visible point in the source series
+        """
+        return len(self.source) - self.end
+
+    def __len__(self):
+        if self.maxlen is None:
+            return self.end
+        return min(self.end, self.maxlen)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.source[self.start + j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('TimeSeriesView index out of range')
+        return self.source[self.start + i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.source[self.start + i]
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not found on the view itself, i.e. the data attributes of the source
+        if name.startswith('_') or name in ('source', 'maxlen', 'end'):
+            raise AttributeError(name)
+        return self.get(name)
+
+    def advance(self, to_time: datetime):
+        """
+        Moving the end pointer to include all points of the source with time <= to_time
+        :return: The number of points that were revealed
+        """
+        if not len(self.source):
+            return 0
+        end = self.source.count_until(to_time)
+        revealed = end - self.end
+        self.end = end
+        return revealed
+
+    def next_time(self):
+        """
+        :return: The timestamp of the next point of the source that is not visible yet, or None if all points are
+        """
+        return self.source.next_time(self.end)
+
+    def get(self, attrib_name):
+        """
+        :return: Slice of the source attribute covering the visible points
+        """
+        if isinstance(self.source, ColumnarTimeSeries):
+            return self.source.columns[attrib_name][self.start:self.start + len(self)]
+        elif len(self.source) and hasattr(self.source[0], attrib_name):
+            return getattr(self.source, attrib_name)[self.start:self.start + len(self)]
+        raise AttributeError(attrib_name)
+
+    def extend(self, other):
+        raise TypeError('TimeSeriesView is read-only')
+
+    def set(self, data):
+        raise TypeError('TimeSeriesView is read-only')
+
+
+class BoundedTimeSeries(TimeSeries):
+
+    """
+    A time series that only keeps the maxlen latest data points in a ring buffer. Used for the retrieved data in live
+    trading, where new points keep arriving and the history would otherwise grow for as long as the session runs.
+    """
+
+    def __init__(self, maxlen: int = None):
+        super().__init__()
+        self.data = deque(maxlen=maxlen)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self.data)[i]
+        return self.data[i]
+
+    def extend(self, other):
+        """
+        Adding newer points to the front of the buffer. The oldest points are dropped when the buffer is full.
+        :param other: List or TimeSeries of data points, newest first
+        """
+        if isinstance(other, TimeSeries):
+            other = list(other)
+        for data_point in reversed(other):
+            self.data.appendleft(data_point)
+        if other:
+            self._sorted_times = None
+            self.update_attributes(other[0])
+
+    def set(self, data):
+        self.data.clear()
+        self.extend(data)
+
+
 class DataPoint:
 
     """
@@ -133,6 +496,54 @@ class DataPoint:
         setattr(self, "datetime", data_dict["datetime"])
 
 
+def sort_columns(columns, time_key='time'):
+    """
+    Sorting the rows of a dict of column arrays newest first. Columns that are already sorted are returned as they are,
+    so memory-mapped columns are not copied.
+
+    :param columns: dict of column name and array
+    :param time_key: Name of the time column
+    :return: dict of column name and array
+    """
+    times = np.asarray(columns[time_key]).astype('datetime64[us]', copy=False)
+    if np.all(times[1:] <= times[:-1]):
+        return dict(columns, **{time_key: times})
+
+    # Sorting on the negated timestamps with a stable sort keeps the order of equal timestamps like list.sort does
+    order = np.argsort(-times.view(np.int64), kind='stable')
+    columns = {name: np.asarray(column)[order] for name, column in columns.items()}
+    columns[time_key] = times[order]
+    return columns
+
+
+def time_series_from_columns(columns, columnar=False, point_type=Bar):
+    """
+    Building a time series directly from arrays, e.g. the columns parsed by the BarProvider or TimeSeriesDataReader.
+    The rows are sorted newest first.
+
+    :param columns: dict of column name and array. The time column must be called 'time' for bars and 'datetime'
+    for data points
+    :param columnar: If True, a ColumnarTimeSeries is returned. If not, a TimeSeries of Bar / DataPoint objects
+    :param point_type: Bar or DataPoint
+    :return: TimeSeries object
+    """
+    columns = sort_columns(columns, 'time' if point_type is Bar else 'datetime')
+
+    if columnar:
+        return ColumnarTimeSeries(columns, point_type)
+
+    if point_type is Bar:
+        data = [Bar(*row) for row in zip(*(columns[name].tolist()
+                                           for name in ('time', 'open', 'close', 'high', 'low', 'volume')))]
+    else:
+        names = list(columns.keys())
+        data = [DataPoint(dict(zip(names, row))) for row in zip(*(columns[name].tolist() for name in names))]
+
+    time_series = TimeSeries()
+    time_series.set(data)
+    return time_series
+
+
 class TimeSeriesDataReader:
 
     """
@@ -144,33 +555,44 @@ class TimeSeriesDataReader:
         pass
 
     @staticmethod
-    def read_csv(csv_path, interval):
+    def read_csv(csv_path, interval, columnar=False, cache=None):
+        """
+        :param csv_path: Path to the csv file
+        :param interval: Interval of the data, used to get the datetime format
+        :param columnar: If True, the data is returned as a ColumnarTimeSeries
+        :param cache: Optional DataCache. The parsed columns are loaded from it if the csv file has not changed
+        :return: TimeSeries object
+        """
         assert isinstance(csv_path, str)
-        df = pd.read_csv(csv_path)
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+        datetime_format = get_datetime_format(interval)
+        options = {'reader': 'TimeSeriesDataReader', 'datetime_format': datetime_format}
+        columns = cache.load(csv_path, options) if cache is not None else None
 
-        cols = [col for col in df.columns]
-        assert cols[0] == "datetime", "First column must be a called datetime"
+        if columns is None:
+            df = pd.read_csv(csv_path)
+            df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
 
-        data_objects = list()
-        datetime_format = get_datetime_format(interval)
+            cols = [col for col in df.columns]
+            assert cols[0] == "datetime", "First column must be a called datetime"
+
+            columns = {col: df[col].to_numpy(dtype=float) for col in cols if col != "datetime"}
+            columns["datetime"] = pd.to_datetime(df["datetime"], format=datetime_format).to_numpy()
+            columns = sort_columns(columns, 'datetime')
 
-        for row in df.itertuples(index=False):
-            row_data = {col: getattr(row, col) for col in cols if col != "datetime"}
-            row_data["datetime"] = datetime.strptime(getattr(row, "datetime"), datetime_format)
-            data_objects.append(DataPoint(row_data))
+            if cache is not None:
+                cache.store(csv_path, options, columns)
 
-        time_series_data = TimeSeries()
-        time_series_data.set(data_objects)
-        return time_series_data
+        return time_series_from_columns(columns, columnar, DataPoint)
 
 
 class RetrievedTimeSeriesData:
 
+    min_lookback = 2
+
     def __init__(self, context: Context):
         """
         The self.asset_data is a default dict that creates another default dict that creates a list as the default
-        argument.
+        argument. In a backtest the data provider stores a TimeSeriesView over each source series in it.
         :param context:
         """
         super().__init__()
@@ -180,3 +602,16 @@ class RetrievedTimeSeriesData:
 
     def __getitem__(self, key):
         return self.asset_data[key]
+
+    def lookback(self, ticker):
+        """
+        The number of data points that has to be kept for an asset. This is the largest lookback declared by the
+        strategies applied to the asset, and at least RetrievedTimeSeriesData.min_lookback since the broker compares
+        the latest bar with the previous one.
+        :param ticker: Ticker of the asset
+        :return: The lookback, or None if any of the strategies does not declare one
+        """
+        lookbacks = [s.lookback() for s in self.context.strategies.values() if ticker in s.assets]
+        if not lookbacks or None in lookbacks:
+            return None
+        return max(lookbacks + [RetrievedTimeSeriesData.min_lookback])
@@ -37,7 +37,7 @@ class BaseRiskManager(RiskManager):
         :return: desired position volume
         """
         asset = self.context.assets[ticker]
-        last_observed_close = self.context.retrieved_data[ticker]['bars'][0].close
+        last_observed_close = self.context.retrieved_data[ticker]['bars'].close[0]
         position_size = self.account.cash * 0.10
         volume = round_down(position_size / last_observed_close, asset.num_decimal_points)
         return volume
@@ -1,6 +1,7 @@
 from shinywaffle.strategy.strategy import TradingStrategy
 from shinywaffle.common.event import events
-from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average
+from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average_column, \
+    simple_moving_average_lookback
 
 
 class AverageCrossOver(TradingStrategy):
@@ -15,6 +16,11 @@ class AverageCrossOver(TradingStrategy):
         self.short = short
         self.long = long
 
+    def lookback(self):
+        # The previous value of both moving averages is calculated with offset=1
+        return max(simple_moving_average_lookback(self.short, offset=1),
+                   simple_moving_average_lookback(self.long, offset=1))
+
     def trading_logic(self, asset):
 
         """
@@ -26,16 +32,22 @@ class AverageCrossOver(TradingStrategy):
 
         bars = self.context.retrieved_data[asset.ticker]['bars']
 
+        # Both moving averages are precomputed over the entire series once and looked up for the current step. The
+        # columns have the same values as simple_moving_average, unlike a SimpleMovingAverageGrid, whose values can
+        # differ in the last digits and flip the comparisons where the averages are equal
+        short_sma = self.column(asset, 'short sma', simple_moving_average_column, self.short, ["close", "high", "low"])
+        long_sma = self.column(asset, 'long sma', simple_moving_average_column, self.long, ["close", "high", "low"])
+
         try:
-            short_current = simple_moving_average(bars, self.short, ["close", "high", "low"], offset=0)
-            short_previous = simple_moving_average(bars, self.short, ["close", "high", "low"], offset=1)
+            short_current = short_sma.at(bars, offset=0)
+            short_previous = short_sma.at(bars, offset=1)
 
-            long_current = simple_moving_average(bars, self.long, ["close", "high", "low"], offset=0)
-            long_previous = simple_moving_average(bars, self.long, ["close", "high", "low"], offset=1)
+            long_current = long_sma.at(bars, offset=0)
+            long_previous = long_sma.at(bars, offset=1)
 
             if short_current > long_current and short_previous < long_previous:
                 order_volume = self.context.account.risk_manager.calculate_position_volume(asset.ticker)
-                limit_price = self.context.retrieved_data[asset.ticker]['bars'][0].close*0.95
+                limit_price = bars.close[0]*0.95
                 return events.SignalEventLimitBuy(asset, order_volume, limit_price)
                 # return events.SignalEventMarketBuy(asset, order_volume)
             elif short_current < long_current and short_previous > long_previous:
@@ -1,5 +1,7 @@
 from shinywaffle.common.context import Context
 from shinywaffle.common.event import events
+import numpy as np
+from shinywaffle.technical_indicators.cross_section import cross_section
 
 
 class TradingStrategy:
@@ -12,32 +14,75 @@ All implemented strategies must inherit from this super class
 Functions:
     - link: Link the strategy object to a financial asset object
     - generate_signal: Evaluates data and generates a signal either "buy" or "sell"
+    - generate_signals: Batch version of generate_signal for strategies overriding batch_trading_logic
+    - lookback: The number of data points the strategy reads. None (default) keeps the entire history
+    - add_indicator: Registers a streaming indicator for an asset, which is updated before trading_logic is called
+    - column: Precomputes an indicator over the entire series of an asset (backtests)
+    - grid: Precomputes an indicator for a grid of windows, shared by all copies of the context (backtests)
+    - cross_section: Precomputes an indicator for all assets on a common timeline, e.g. to rank the assets (backtests)
     - self2dict: Generating the main meta data for the objects in a dict that can be dumped into a json file
 
 """
 
+    # Attributes holding objects that are not reported
+    _unreported = ('context', 'assets', 'indicators', 'columns', 'cross_sections')
+
+    _signal_types = (events.SignalEventMarketBuy,
+                    events.SignalEventMarketSell,
+                    events.SignalEventLimitBuy,
+                    events.SignalEventLimitSell)
+
+    # Bar attributes passed to batch_trading_logic, one array per attribute with one value per asset
+    _batch_attributes = ('open', 'high', 'low', 'close', 'volume')
+
     def __init__(self, context: Context, name):
         self.name = name
         self.assets = {}
+        self.indicators = {}
+        self.columns = {}
+        self.cross_sections = {}
         self.context = context
         self.context.strategies[self.name] = self
 
     def generate_signal(self, asset) -> list:
         if asset.ticker in self.assets.keys():
+            self.update_indicators(asset)
             signals = [self.trading_logic(asset)]
-            if signals:
-                assert all([type(s) == events.SignalEventMarketBuy or
-                            type(s) == events.SignalEventMarketSell or
-                            type(s) == events.SignalEventLimitBuy or
-                            type(s) == events.SignalEventLimitSell or
-                            s is None for
-                            s in signals]), 'Generated event needs to be of the type events.SignalEventMarketBuy, ' \
-                                            'events.SignalEventMarketSell, events.SignalEventLimitBuy or ' \
-                                            'events.SignalEventLimitSell'
+            self.check_signals(signals)
             return signals
         else:
             return [None]
 
+    def generate_signals(self, assets) -> list:
+        """
+        Batch version of generate_signal, called by the event handler once per step with all assets that got new
+        data in the step, for strategies overriding batch_trading_logic
+
+        :param assets: list of Asset objects updated in the current step
+        :return: list of signal events
+        """
+        assets = [a for a in assets if a.ticker in self.assets]
+        if not assets:
+            return []
+
+        for asset in assets:
+            self.update_indicators(asset)
+
+        # Reading the latest value from the columns of each series instead of building a Bar per asset
+        series = [self.context.retrieved_data[a.ticker]['bars'] for a in assets]
+        prices = {attribute: np.array([getattr(bars, attribute)[0] for bars in series])
+                  for attribute in TradingStrategy._batch_attributes}
+
+        signals = list(self.batch_trading_logic(assets, prices) or [])
+        self.check_signals(signals)
+        return signals
+
+    @staticmethod
+    def check_signals(signals):
+        assert all(type(s) in TradingStrategy._signal_types or s is None for s in signals), \
+            'Generated event needs to be of the type events.SignalEventMarketBuy, events.SignalEventMarketSell, ' \
+            'events.SignalEventLimitBuy or events.SignalEventLimitSell'
+
     def trading_logic(self, asset):
         """
         This method needs to be overridden to include the logic behind the signal generation. This method needs to
@@ -47,6 +92,112 @@ Functions:
         """
         raise NotImplementedError
 
+    def batch_trading_logic(self, assets, prices):
+        """
+        This method can be overridden instead of trading_logic to generate the signals for all assets updated in a
+        step with one call, e.g. vectorized with NumPy. The strategy is then only called through generate_signals.
+
+        :param assets: list of Asset objects updated in the current step
+        :param prices: dict of bar attribute (open, high, low, close, volume) and array with the latest value of each
+        asset, in the same order as assets
+        :return: list of signal events
+        """
+        raise NotImplementedError
+
+    def is_batch(self):
+        """
+        :return: True if the strategy overrides batch_trading_logic
+        """
+        return type(self).batch_trading_logic is not TradingStrategy.batch_trading_logic
+
+    def lookback(self):
+        """
+        This method can be overridden to declare the maximum number of data points (latest first) the trading_logic
+        method reads from each series of an asset. The data provider then only keeps that many points per asset and
+        series in context.retrieved_data.
+
+        :return: number of data points, or None to keep the entire history
+        """
+        return None
+
+    def add_indicator(self, asset, name, indicator, series='bars'):
+        """
+        Registering a streaming indicator (StreamingIndicator) for an asset. The indicator is updated with the new
+        points of the retrieved series before trading_logic is called, and its value is read with self.indicator()
+
+        :param asset: Asset object
+        :param name: Name to be referenced
+        :param indicator: StreamingIndicator object
+        :param series: Name of the retrieved series the indicator is updated from
+        """
+        self.indicators.setdefault(asset.ticker, {})[name] = (series, indicator)
+
+    def update_indicators(self, asset):
+        for series, indicator in self.indicators.get(asset.ticker, {}).values():
+            indicator.update(self.context.retrieved_data[asset.ticker][series])
+
+    def indicator(self, asset, name):
+        """
+        :return: The current value of a registered streaming indicator
+        """
+        return self.indicators[asset.ticker][name][1].value
+
+    def column(self, asset, name, column_function, *args, series='bars', **kwargs):
+        """
+        Precomputing an indicator over the entire series of an asset the first time it is requested. The value for
+        the current step is read with .at(data_series, offset), see IndicatorColumn
+
+        :param asset: Asset object
+        :param name: Name to be referenced
+        :param column_function: Function precomputing the indicator, e.g. simple_moving_average_column
+        :param args: Arguments of the column function after data_series
+        :param series: Name of the retrieved series the indicator is computed from
+        :return: IndicatorColumn
+        """
+        columns = self.columns.setdefault(asset.ticker, {})
+        if name not in columns:
+            columns[name] = column_function(self.context.retrieved_data[asset.ticker][series], *args, **kwargs)
+        return columns[name]
+
+    def grid(self, asset, grid_function, windows, attributes, series='bars'):
+        """
+        Looking up the grid of an indicator over the entire series of an asset, or computing it the first time. The
+        grids are stored in context.indicator_grids, which is shared by all copies of the context, so the runs of a
+        workflow sweeping the windows of a strategy only compute each window once. The values of a grid can differ
+        from the indicator function in the last digits, so strategies comparing indicators that can be equal should
+        use column() instead
+
+        :param asset: Asset object
+        :param grid_function: Function precomputing the grid, e.g. simple_moving_average_grid
+        :param windows: list of windows that are needed
+        :param attributes: list of data attributes the indicator is calculated from
+        :param series: Name of the retrieved series the indicator is computed from
+        :return: IndicatorGrid. grid.column(window) returns the IndicatorColumn of a window
+        """
+        key = (asset.ticker, series, grid_function, tuple(attributes) if type(attributes) == list else (attributes,))
+        grids = self.context.indicator_grids
+        if key not in grids:
+            grids[key] = grid_function(self.context.retrieved_data[asset.ticker][series], windows, attributes)
+        else:
+            grids[key].add(*windows)
+        return grids[key]
+
+    def cross_section(self, name, indicator, *args, series='bars', **kwargs):
+        """
+        Precomputing an indicator for all assets in the context the first time it is requested. The value of an
+        asset at the current step is read with .at(asset, self.context.retrieved_data.time), also after
+        .rank() or .normalise(), see CrossSection
+
+        :param name: Name to be referenced
+        :param indicator: Column function, e.g. z_score_column, or the name of a data attribute, e.g. 'volume'
+        :param args: Arguments of the column function after data_series
+        :param series: Name of the series of the assets the indicator is computed from
+        :return: CrossSection
+        """
+        if name not in self.cross_sections:
+            self.cross_sections[name] = cross_section(self.context, indicator, *args, series=series, **kwargs)
+        return self.cross_sections[name]
+
     def apply_to_asset(self, *assets):
         from shinywaffle.common.assets.assets import Asset
         for asset in assets:
@@ -59,7 +210,7 @@ Functions:
                       and not a.startswith("_")
                       and a not in dir("__builtins__")
                       and not hasattr(getattr(self, a), "__call__")
-                      and not a == 'context' and not a == 'assets']
+                      and a not in TradingStrategy._unreported]
 
         data = {a: getattr(self, a) for a in attributes}
 
@@ -1,5 +1,266 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from shinywaffle.data.time_series_data import TimeSeriesView
 
 
 class TooSmallWindowException(Exception):
     def __init__(self):
         super().__init__()
+
+
+class StreamingIndicator:
+
+    """
+    Base class for stateful indicators that are updated in O(1) per new data point, instead of being recomputed over
+    the whole window on every call like the indicator functions.
+
+    The indicator is registered once per asset (see TradingStrategy.add_indicator) and update() is called with the
+    retrieved data series on every step. Only the points that are newer than the last point seen are pushed. The
+    current value is read from the value property, which is TooSmallWindowException until enough points are seen.
+    """
+
+    def __init__(self, window, attributes):
+        """
+        :param window: the look back window
+        :param attributes: list of data attributes that are averaged into the value pushed for each data point
+        """
+        if type(attributes) != list:
+            attributes = [attributes]
+
+        self.window = window
+        self.attributes = attributes
+        self.last_time = None
+
+    @staticmethod
+    def point_time(data_point):
+        return data_point.time if hasattr(data_point, 'time') else data_point.datetime
+
+    def update(self, data_series):
+        """
+        Pushing the points of the data series that are newer than the last point seen, oldest first
+        :param data_series: A TimeSeries (newest first), e.g. context.retrieved_data[ticker]['bars']
+        :return: the current value
+        """
+        new_points = 0
+        while new_points < len(data_series) and \
+                (self.last_time is None or self.point_time(data_series[new_points]) > self.last_time):
+            new_points += 1
+
+        for i in reversed(range(new_points)):
+            data_point = data_series[i]
+            self.push_point(data_point)
+            if i == 0:
+                self.last_time = self.point_time(data_point)
+
+        return self.value
+
+    def push_point(self, data_point):
+        """
+        Updating the indicator with a new data point. By default the attributes are averaged and pushed with push().
+        Indicators reading the attributes separately (e.g. high, low and close) override this method instead
+        """
+        self.push(sum(getattr(data_point, a) for a in self.attributes) / len(self.attributes))
+
+    def push(self, x):
+        """
+        Updating the indicator with a new value
+        :param x: float
+        """
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        raise NotImplementedError
+
+
+class IndicatorColumn:
+
+    """
+    An indicator precomputed over an entire series with vectorized operations, for backtests where all data is known
+    in advance. values[i] is the value the indicator function returns at offset i from the newest point of the
+    source series, so it only uses the points from i and older (no lookahead).
+
+    The value for the retrieved data of a step is looked up with at(). The retrieved data in a backtest is a
+    TimeSeriesView over the source series, whose newest visible point is source[view.start], so the lookup is
+    values[view.start + offset]. If the view does not show the full window (the first steps of the backtest), or
+    the series is not a view of the source series (live trading), the indicator function is called instead, so at()
+    always returns the same as the indicator function.
+    """
+
+    def __init__(self, function, source, values, lookback, *args, **kwargs):
+        """
+        :param function: The indicator function, e.g. simple_moving_average
+        :param source: The series the values are computed over
+        :param values: array with the value for each point of the source series, newest first
+        :param lookback: Number of data points the indicator function needs at offset 0
+        :param args: The arguments of the indicator function after data_series
+        :param kwargs: The keyword arguments of the indicator function, except offset
+        """
+        self.function = function
+        self.source = source
+        self.values = values
+        self.lookback = lookback
+        self.args = args
+        self.kwargs = kwargs
+
+    def at(self, data_series, offset=0):
+        """
+        :param data_series: The retrieved data series of the current step
+        :param offset: the offset of the start of the window
+        :return: The value of the indicator function for data_series and offset
+        """
+        if not isinstance(data_series, TimeSeriesView) or data_series.source is not self.source or \
+                offset + self.lookback > len(data_series):
+            return self.function(data_series, *self.args, offset=offset, **self.kwargs)
+
+        value = self.values[data_series.start + offset]
+        return tuple(value) if np.ndim(value) else value
+
+
+class IndicatorGrid:
+
+    """
+    IndicatorColumns of one indicator over the same series for a whole grid of windows, e.g. the windows swept by a
+    BacktestWorkflow. The windows are computed together by compute(), and windows that are requested later are
+    added to the grid, so each window is only computed once.
+    """
+
+    def __init__(self, function, lookback_function, source, attributes, **kwargs):
+        """
+        :param function: The indicator function, e.g. simple_moving_average
+        :param lookback_function: Function returning the lookback of the indicator function for a window
+        :param source: The series the values are computed over
+        :param attributes: list of data attributes the indicator is calculated from
+        :param kwargs: Other keyword arguments of the indicator function
+        """
+        self.function = function
+        self.lookback_function = lookback_function
+        self.source = source
+        self.attributes = attributes
+        self.kwargs = kwargs
+        self.columns = {}
+
+    def add(self, *windows):
+        """
+        Computing the windows that are not in the grid yet
+        """
+        new_windows = sorted(set(windows) - set(self.columns))
+        if new_windows:
+            for window, values in zip(new_windows, self.compute(np.array(new_windows))):
+                self.columns[window] = IndicatorColumn(self.function, self.source, values,
+                                                       self.lookback_function(window), window, self.attributes,
+                                                       **self.kwargs)
+
+    def compute(self, windows):
+        """
+        :param windows: array of windows
+        :return: 2D array with one row of values (newest first) per window
+        """
+        raise NotImplementedError
+
+    def column(self, window):
+        """
+        :return: IndicatorColumn for the window
+        """
+        if window not in self.columns:
+            self.add(window)
+        return self.columns[window]
+
+    def __getitem__(self, window):
+        return self.column(window)
+
+
+def source_series(data_series):
+    """
+    :return: The entire series behind the retrieved data, i.e. the source of a TimeSeriesView
+    """
+    return data_series.source if isinstance(data_series, TimeSeriesView) else data_series
+
+
+def averaged_windows(data_series, window, attributes):
+    """
+    Averaging the attributes of the entire series and splitting them into all windows of a given size in one pass.
+    Row i holds the window used at offset i, i.e. the same values as averaging getattr(data_series, attrib)[i:i+window]
+
+    :param data_series: The entire series (see source_series)
+    :param window: the window size
+    :param attributes: list of data attributes that are averaged
+    :return: 2D array (without copying) with one row per offset. Rows past the end of the series are left out
+    """
+    avg_array = averaged_attributes(data_series, attributes)
+    if avg_array.size < window:
+        return np.empty((0, window))
+    return sliding_window_view(avg_array, window)
+
+
+def averaged_attributes(data_series, attributes):
+    """
+    :return: array with the attributes of the entire series averaged, newest first
+    """
+    if type(attributes) != list:
+        attributes = [attributes]
+
+    arrays = []
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)))
+
+    return sum(arrays) / len(arrays)
+
+
+def padded(values, size, fill=np.nan):
+    """
+    :return: values padded with fill at the end (the oldest points) to the given size
+    """
+    result = np.full((size,) + values.shape[1:], fill)
+    result[:len(values)] = values
+    return result
+
+
+class IndicatorCache:
+
+    """
+    Memoizing cache for the indicator functions, shared by all strategies through context.indicator_cache.
+
+    Values are keyed by (asset, series, indicator, window, attributes, offset, kwargs), so identical requests within
+    a step, from one or several strategies, are only computed once. All values are dropped when the step advances
+    (context.retrieved_data.time changes), so the cache only ever holds the values of the step at self.time.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.time = None
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, function, asset, window, attributes, offset=0, series='bars', **kwargs):
+        """
+        :param function: The indicator function, e.g. simple_moving_average
+        :param asset: Asset object
+        :param window: the look back window
+        :param attributes: list of data attributes the indicator is calculated from
+        :param offset: the offset of the start of the window
+        :param series: Name of the retrieved series the indicator is calculated from
+        :param kwargs: Other keyword arguments of the indicator function, e.g. num_stdev
+        :return: The value of function(context.retrieved_data[asset.ticker][series], window, attributes, offset)
+        """
+        if self.context.retrieved_data.time != self.time:
+            self.values.clear()
+            self.time = self.context.retrieved_data.time
+
+        data_series = self.context.retrieved_data[asset.ticker][series]
+        key = (asset.ticker, series, function, window,
+               tuple(attributes) if type(attributes) == list else (attributes,), offset, tuple(sorted(kwargs.items())))
+
+        try:
+            value = self.values[key]
+        except KeyError:
+            self.misses += 1
+            value = self.values[key] = function(data_series, window, attributes, offset=offset, **kwargs)
+        else:
+            self.hits += 1
+        return value
+
+    def report(self):
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,87 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, padded
+from shinywaffle.technical_indicators.simple_moving_average import SimpleMovingAverage
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+
+
+def atr(data_series, window, attributes=None, offset=0):
+    """
+    Average true range, the mean of the true range of the last window points. The true range of a point is
+    max(high, previous close) - min(low, previous close)
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the look back window
+    :param attributes: names of the high, low and close attributes. Defaults to ['high', 'low', 'close']
+    :param offset: the offset of the start of the window
+    :return: the ATR as a float
+    """
+
+    assert isinstance(data_series, TimeSeries)
+
+    if attributes is None:
+        attributes = ['high', 'low', 'close']
+
+    arrays = []
+    # Window is extended by 1 to get the previous close of the oldest point in the window
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window + 1]))
+
+    if arrays[0].size >= window + 1:
+        return np.mean(true_range(*arrays))
+    else:
+        return TooSmallWindowException
+
+
+def true_range(high, low, close):
+    """
+    :param high: array of highs, newest first
+    :param low: array of lows, newest first
+    :param close: array of closes, newest first
+    :return: array with the true range of each point except the oldest one, which has no previous close
+    """
+    previous_close = close[1:]
+    return np.maximum(high[:-1], previous_close) - np.minimum(low[:-1], previous_close)
+
+
+def atr_lookback(window, offset=0):
+    """
+    The true range of the oldest point in the window also reads the close before it
+    :return: number of data points
+    """
+    return window + 1 + offset
+
+
+def atr_column(data_series, window, attributes=None):
+    """
+    The rolling mean of the true ranges of the series
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    ranges = true_range(*[np.asarray(getattr(source, a)) for a in (attributes or ['high', 'low', 'close'])])
+    values = np.mean(sliding_window_view(ranges, window), axis=1) if ranges.size >= window else np.empty(0)
+    return IndicatorColumn(atr, source, padded(values, len(source)), atr_lookback(window), window, attributes)
+
+
+class AverageTrueRange(StreamingIndicator):
+
+    """
+    Streaming average true range. The true ranges are averaged with SimpleMovingAverage
+    """
+
+    def __init__(self, window, attributes=None):
+        super().__init__(window, attributes if attributes is not None else ['high', 'low', 'close'])
+        self.previous_close = None
+        self.average = SimpleMovingAverage(window, [])
+
+    def push_point(self, data_point):
+        high, low, close = [getattr(data_point, a) for a in self.attributes]
+        if self.previous_close is not None:
+            self.average.push(max(high, self.previous_close) - min(low, self.previous_close))
+        self.previous_close = close
+
+    @property
+    def value(self):
+        return self.average.value
@@ -1,7 +1,10 @@
 import numpy as np
-from data.time_series_data import TimeSeries
-from technical_indicators.simple_moving_average import simple_moving_average
-from technical_indicators import TooSmallWindowException
+import math as m
+from collections import deque
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, averaged_windows, padded
 
 
 def bollinger_bands(data_series, window, attributes, num_stdev=2, offset=0):
@@ -15,7 +18,7 @@ def bollinger_bands(data_series, window, attributes, num_stdev=2, offset=0):
     arrays = []
     for attrib in attributes:
         assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
-        arrays.append(np.array(getattr(data_series, attrib)[offset:offset + window]))
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
 
     std_dev = np.std((sum(arrays) / len(arrays)))
     moving_average = simple_moving_average(data_series, window, attributes, offset)
@@ -24,3 +27,83 @@ def bollinger_bands(data_series, window, attributes, num_stdev=2, offset=0):
         return moving_average + num_stdev * std_dev, moving_average - num_stdev * std_dev
     else:
         return TooSmallWindowException
+
+
+def bollinger_bands_lookback(window, offset=0):
+    """
+    The mean and the standard deviation are taken over the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def bollinger_bands_column(data_series, window, attributes, num_stdev=2):
+    """
+    The bands of all windows of the series, from a sliding window view. Each value is a row with the
+    upper and the lower band
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    windows = averaged_windows(source, window, attributes)
+    std_dev = np.std(windows, axis=1)
+    moving_average = np.mean(windows, axis=1)
+    bands = np.stack([moving_average + num_stdev * std_dev, moving_average - num_stdev * std_dev], axis=1)
+    values = padded(bands, len(source))
+    return IndicatorColumn(bollinger_bands, source, values, bollinger_bands_lookback(window),
+                           window, attributes, num_stdev=num_stdev)
+
+
+class BollingerBands(StreamingIndicator):
+
+    """
+    Streaming Bollinger bands. The mean and the sum of squared deviations (M2) of the values in the window are kept
+    with Welford's algorithm, extended to remove the value that leaves the window. The bands use the population
+    standard deviation like bollinger_bands.
+
+    The mean and M2 are recomputed from the values in the window every window pushes. The number of equal latest
+    values is counted so that the standard deviation of a constant window is exactly 0.
+    """
+
+    def __init__(self, window, attributes, num_stdev=2):
+        super().__init__(window, attributes)
+        self.num_stdev = num_stdev
+        self.values = deque()
+        self.mean = 0.
+        self.m2 = 0.
+        self.num_equal = 0
+        self.num_pushed = 0
+
+    def push(self, x):
+        self.num_equal = self.num_equal + 1 if self.values and self.values[-1] == x else 1
+        self.values.append(x)
+        if len(self.values) > self.window:
+            # Replacing the oldest value y with x in one step
+            y = self.values.popleft()
+            mean = self.mean + (x - y) / self.window
+            self.m2 += (x - y) * (x - mean + y - self.mean)
+            self.mean = mean
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+
+        self.num_pushed += 1
+        if self.num_pushed % self.window == 0:
+            self.mean = m.fsum(self.values) / len(self.values)
+            self.m2 = m.fsum((v - self.mean) ** 2 for v in self.values)
+
+    @property
+    def std_dev(self):
+        """
+        :return: The population standard deviation of the window
+        """
+        if self.num_equal >= self.window:
+            return 0.
+        return m.sqrt(max(self.m2, 0.) / self.window)
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return TooSmallWindowException
+        std_dev = self.std_dev
+        return self.mean + self.num_stdev * std_dev, self.mean - self.num_stdev * std_dev
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from shinywaffle.technical_indicators import IndicatorColumn
+
+
+class CrossSection:
+
+    """
+    Values of an indicator for every asset of the universe on a common timeline, stored as an assets x time matrix.
+    matrix[i, j] is the value of asset tickers[i] at times[j], taken from the latest point of the asset with a time
+    <= times[j], so there is no lookahead. Assets without a point yet are nan.
+
+    rank() and normalise() work on all assets and times at once and are cached, and at() looks up the value of an
+    asset at a time in O(1) for increasing times, e.g. the rank of an asset at the current step.
+
+    The lookups move a cursor over the times that is kept in the CrossSection. Lookups in any other order still give
+    the right value, but each one costs a binary search. So a CrossSection should not be shared between callers
+    looking up different times, e.g. two backtests over one context. TradingStrategy.cross_section keeps one per
+    strategy.
+    """
+
+    def __init__(self, tickers, times, matrix):
+        """
+        :param tickers: list of tickers, one per row
+        :param times: ascending datetime64 array, one per column
+        :param matrix: 2D array with one row per asset and one column per time
+        """
+        self.tickers = tickers
+        self.rows = {ticker: i for i, ticker in enumerate(tickers)}
+        self.times = times
+        self.matrix = matrix
+        self.index = -1
+        self.transforms = {}
+
+    def rank(self, descending=False):
+        """
+        Ranking the assets at each time, starting at 1. Ties get the average rank and nan values are not ranked
+        :param descending: If True, the largest value gets rank 1
+        :return: CrossSection with the ranks
+        """
+        key = ('rank', descending)
+        if key not in self.transforms:
+            ranks = pd.DataFrame(self.matrix).rank(axis=0, ascending=not descending).to_numpy()
+            self.transforms[key] = CrossSection(self.tickers, self.times, ranks)
+        return self.transforms[key]
+
+    def normalise(self):
+        """
+        Normalising the values at each time to the cross-sectional z-score, (value - mean) / standard deviation over
+        the assets with a value. If all assets have the same value, the z-score is 0
+        :return: CrossSection with the z-scores
+        """
+        key = ('normalise',)
+        if key not in self.transforms:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = np.nanmean(self.matrix, axis=0)
+                std_dev = np.nanstd(self.matrix, axis=0)
+                z_scores = np.where(std_dev == 0, 0., (self.matrix - mean) / std_dev)
+            z_scores[np.isnan(self.matrix)] = np.nan
+            self.transforms[key] = CrossSection(self.tickers, self.times, z_scores)
+        return self.transforms[key]
+
+    def time_index(self, time):
+        """
+        :return: Index of the latest time <= time, or -1 if there is none. The index is kept between calls, so
+        looking up increasing times is O(1)
+        """
+        time = np.datetime64(time, 'us')
+        following = self.index + 1
+        if self.index >= 0 and self.times[self.index] > time or \
+                following + 1 < self.times.size and self.times[following + 1] <= time:
+            self.index = int(np.searchsorted(self.times, time, side='right')) - 1
+        elif following < self.times.size and self.times[following] <= time:
+            self.index = following
+        return self.index
+
+    def at(self, asset, time):
+        """
+        :param asset: Asset object or ticker
+        :param time: datetime, e.g. context.retrieved_data.time
+        :return: The value of the asset at the time
+        """
+        index = self.time_index(time)
+        if index < 0:
+            return np.nan
+        return self.matrix[self.rows[getattr(asset, 'ticker', asset)], index]
+
+
+def cross_section(context, indicator, *args, series='bars', **kwargs):
+    """
+    Computing an indicator for all assets in context.assets and aligning them on the union of their times
+
+    :param context: Context object
+    :param indicator: Column function, e.g. z_score_column, or the name of a data attribute, e.g. 'volume'
+    :param args: Arguments of the column function after data_series
+    :param series: Name of the series of the assets the indicator is computed from
+    :param kwargs: Keyword arguments of the column function
+    :return: CrossSection
+    """
+    tickers = list(context.assets.keys())
+    sources = []
+    for asset in context.assets.values():
+        if series == 'bars':
+            sources.append(asset.bars)
+            continue
+        try:
+            sources.append(asset.data[series])
+        except KeyError:
+            # Assets without the series are left out of the cross-section
+            sources.append(None)
+
+    columns = []
+    for source in sources:
+        if source is None or not len(source):
+            columns.append((np.empty(0, dtype='datetime64[us]'), np.empty(0)))
+            continue
+
+        if isinstance(indicator, str):
+            values = np.asarray(getattr(source, indicator), dtype=float)
+        else:
+            column = indicator(source, *args, **kwargs)
+            assert isinstance(column, IndicatorColumn)
+            values = column.values
+        assert values.ndim == 1, "Only indicators with a single value per point can be cross-sectional"
+
+        # Ascending times and values, since the series are newest first
+        columns.append((np.asarray(source.sorted_times(), dtype='datetime64[us]'), values[::-1]))
+
+    times = np.unique(np.concatenate([t for t, _ in columns])) if columns else np.empty(0, dtype='datetime64[us]')
+    matrix = np.full((len(tickers), times.size), np.nan)
+    for row, (asset_times, values) in enumerate(columns):
+        latest = np.searchsorted(asset_times, times, side='right') - 1
+        matrix[row, latest >= 0] = values[latest[latest >= 0]]
+
+    return CrossSection(tickers, times, matrix)
@@ -0,0 +1,100 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, padded
+from numpy.lib.stride_tricks import sliding_window_view
+from collections import deque
+import numpy as np
+
+
+def donchian_channels(data_series, window, attributes=None, offset=0):
+    """
+    Donchian channels, the highest high and the lowest low of the last window points
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the look back window
+    :param attributes: names of the high and the low attributes. Defaults to ['high', 'low']
+    :param offset: the offset of the start of the window
+    :return: tuple of the upper and the lower channel
+    """
+
+    assert isinstance(data_series, TimeSeries)
+
+    if attributes is None:
+        attributes = ['high', 'low']
+
+    arrays = []
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
+
+    high, low = arrays
+    if high.size >= window:
+        return np.max(high), np.min(low)
+    else:
+        return TooSmallWindowException
+
+
+def donchian_channels_lookback(window, offset=0):
+    """
+    The channels are the highest high and the lowest low of the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def donchian_channels_column(data_series, window, attributes=None):
+    """
+    The rolling highest high and lowest low. Each value is a row with the upper and the lower channel
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    high, low = [np.asarray(getattr(source, a)) for a in (attributes or ['high', 'low'])]
+    if high.size >= window:
+        channels = np.stack([np.max(sliding_window_view(high, window), axis=1),
+                             np.min(sliding_window_view(low, window), axis=1)], axis=1)
+    else:
+        channels = np.empty((0, 2))
+    return IndicatorColumn(donchian_channels, source, padded(channels, len(source)),
+                           donchian_channels_lookback(window), window, attributes)
+
+
+class DonchianChannels(StreamingIndicator):
+
+    """
+    Streaming Donchian channels. The highs and lows in the window are kept in monotonic queues, so the highest high
+    and the lowest low are always first and each point is added and removed once (amortised O(1)).
+    """
+
+    def __init__(self, window, attributes=None):
+        super().__init__(window, attributes if attributes is not None else ['high', 'low'])
+        self.count = 0
+        self.highs = deque()
+        self.lows = deque()
+
+    def push_point(self, data_point):
+        high, low = [getattr(data_point, a) for a in self.attributes]
+        self.push_high_low(high, low)
+
+    def push_high_low(self, high, low):
+        """
+        Updating the channels with the high and the low of a new data point
+        """
+        self.count += 1
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.count, high))
+        if self.highs[0][0] <= self.count - self.window:
+            self.highs.popleft()
+
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.count, low))
+        if self.lows[0][0] <= self.count - self.window:
+            self.lows.popleft()
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return TooSmallWindowException
+        return self.highs[0][1], self.lows[0][1]
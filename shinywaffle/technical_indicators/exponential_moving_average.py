@@ -1,6 +1,8 @@
-from data.time_series_data import TimeSeries
-from technical_indicators import TooSmallWindowException
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, averaged_windows, padded
 import numpy as np
+from collections import deque
 
 
 def exponential_moving_average(data_series, window, attributes, offset=0):
@@ -14,9 +16,12 @@ def exponential_moving_average(data_series, window, attributes, offset=0):
     arrays = []
     for attrib in attributes:
         assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
-        arrays.append(np.array(getattr(data_series, attrib)[offset:offset + window]))
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
 
     avg_array = sum(arrays) / len(arrays)
+    if avg_array.size < window:
+        return TooSmallWindowException
+
     k = 2 / (window + 1)
     ema_list = [0]*avg_array.size
     ema_list[-1] = avg_array[-1]
@@ -26,7 +31,79 @@ def exponential_moving_average(data_series, window, attributes, offset=0):
         else:
             ema_list[i] = avg_array[i]*k + ema_list[i+1] * (1-k)
 
-    if len(ema_list) >= window:
-        return ema_list[0]
-    else:
-        return TooSmallWindowException
+    return ema_list[0]
+
+
+def exponential_moving_average_lookback(window, offset=0):
+    """
+    The recursion is seeded with the oldest of the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def exponential_moving_average_column(data_series, window, attributes):
+    """
+    The recursion of exponential_moving_average, run over the windows of all offsets at once
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    windows = averaged_windows(source, window, attributes)
+    k = 2 / (window + 1)
+    ema = windows[:, -1]
+    for i in reversed(range(window - 1)):
+        ema = windows[:, i] * k + ema * (1 - k)
+    values = padded(ema, len(source))
+    return IndicatorColumn(exponential_moving_average, source, values, exponential_moving_average_lookback(window),
+                           window, attributes)
+
+
+class ExponentialMovingAverage(StreamingIndicator):
+
+    """
+    Streaming version of exponential_moving_average. By default the recursion ema = x * k + ema * (1 - k) with
+    k = 2 / (window + 1) only runs over the window latest values and is seeded with the oldest of them, like the
+    function. The value is then k * S + (1 - k)^window * oldest value, where S is the sum of the values in the window
+    weighted with (1 - k)^age, which is updated by adding the new value and removing the one leaving the window.
+
+    With recursive=True the recursion runs over the entire history and is seeded with the first value, which is not
+    the same as the function. It has a value once window points are seen.
+    """
+
+    def __init__(self, window, attributes, recursive=False):
+        """
+        :param recursive: If True, the average is recursive over the entire history
+        """
+        super().__init__(window, attributes)
+        self.recursive = recursive
+        self.values = deque()
+        self.weighted_sum = 0.
+        self.ema = None
+        self.num_pushed = 0
+
+    def push(self, x):
+        self.num_pushed += 1
+        k = 2 / (self.window + 1)
+        if self.recursive:
+            self.ema = x if self.ema is None else x * k + self.ema * (1 - k)
+            return
+
+        self.values.append(x)
+        self.weighted_sum = x + (1 - k) * self.weighted_sum
+        if len(self.values) > self.window:
+            self.weighted_sum -= (1 - k) ** self.window * self.values.popleft()
+
+        # Summing the window again from scratch once every window updates
+        if self.num_pushed % self.window == 0:
+            self.weighted_sum = 0.
+            for value in self.values:
+                self.weighted_sum = value + (1 - k) * self.weighted_sum
+
+    @property
+    def value(self):
+        if self.num_pushed < self.window:
+            return TooSmallWindowException
+        if self.recursive:
+            return self.ema
+        k = 2 / (self.window + 1)
+        return k * self.weighted_sum + (1 - k) ** self.window * self.values[0]
@@ -0,0 +1,167 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, averaged_attributes
+from collections import deque
+import numpy as np
+import pandas as pd
+
+
+# Number of slow windows the exponential moving averages of macd are computed over
+lookback_windows = 4
+
+
+def macd(data_series, window, attributes, offset=0, fast_window=12, signal_window=9):
+    """
+    Moving average convergence divergence. The MACD line is the exponential moving average over fast_window points
+    minus the exponential moving average over window (the slow window) points, and the signal line is the
+    exponential moving average of the MACD line over signal_window points.
+
+    The averages are recursive over the lookback_windows * window latest points from offset and seeded with the
+    oldest of them, so the value does not depend on how much older history is available. With 4 slow windows the
+    seed weighs about 3e-4 in the slow average, so the value is close to the one of an average over the entire
+    history. Until lookback_windows * window points are available (the warm-up), the averages are seeded with the
+    oldest point available. The MACD has a value once there are window points.
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the slow window, usually 26
+    :param attributes: list of attributes that should be used (and averaged) to calculate the MACD
+    :param offset: the offset from the start of the window
+    :param fast_window: the fast window, usually 12
+    :param signal_window: the window of the signal line, usually 9
+    :return: tuple of the MACD line and the signal line
+    """
+
+    assert isinstance(data_series, TimeSeries)
+    assert isinstance(attributes, list) or isinstance(attributes, str)
+
+    if type(attributes) != list:
+        attributes = [attributes]
+
+    lookback = macd_lookback(window)
+    arrays = []
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + lookback]))
+
+    avg_array = sum(arrays) / len(arrays)
+    if avg_array.size >= window:
+        macd_line, signal_line = macd_lines(avg_array[::-1], window, fast_window, signal_window)
+        return macd_line[-1], signal_line[-1]
+    else:
+        return TooSmallWindowException
+
+
+def macd_lines(values, window, fast_window, signal_window):
+    """
+    :param values: array, oldest first. A 2D array is computed column by column
+    :return: the MACD line and the signal line for every point, oldest first
+    """
+    macd_line = ewm(values, fast_window) - ewm(values, window)
+    return macd_line, ewm(macd_line, signal_window)
+
+
+def ewm(values, window):
+    """
+    :return: The recursive exponential moving average of an array (oldest first), seeded with the first value
+    """
+    return pd.DataFrame(values).ewm(alpha=2 / (window + 1), adjust=False).mean().to_numpy().reshape(np.shape(values))
+
+
+def macd_states(values, window, fast_window, signal_window):
+    """
+    :param values: array, oldest first
+    :return: array with a row (fast average, slow average, signal line) for every point, oldest first, recursive over
+    all values and seeded with the first value
+    """
+    fast, slow = ewm(values, fast_window), ewm(values, window)
+    return np.stack([fast, slow, ewm(fast - slow, signal_window)], axis=1)
+
+
+def macd_propagator(window, fast_window, signal_window):
+    """
+    One step of the recursion of macd_states is state = A @ previous state + B * value. The averages of macd are
+    seeded with the oldest of the lookback points, which is the same as a history where all older values are equal to
+    it, i.e. starting from the state (value, value, 0). So the state of macd is the state recursive over the entire
+    history minus A^(lookback - 1) @ (the recursive state at the oldest point - (oldest value, oldest value, 0)).
+
+    :return: A^(lookback - 1)
+    """
+    fast_alpha, slow_alpha, signal_alpha = (2 / (w + 1) for w in (fast_window, window, signal_window))
+    transition = np.array([[1 - fast_alpha, 0., 0.],
+                           [0., 1 - slow_alpha, 0.],
+                           [signal_alpha * (1 - fast_alpha), -signal_alpha * (1 - slow_alpha), 1 - signal_alpha]])
+    return np.linalg.matrix_power(transition, macd_lookback(window) - 1)
+
+
+def macd_lookback(window, offset=0):
+    """
+    The averages are run over lookback_windows windows and cut off there, see macd_states
+    :return: number of data points
+    """
+    return lookback_windows * window + offset
+
+
+def macd_column(data_series, window, attributes, fast_window=12, signal_window=9):
+    """
+    The column is computed from one recursive pass over the entire series with macd_states, corrected for the seed
+    of each offset with macd_propagator. Each value is a row with the MACD line and the signal line
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    lookback = macd_lookback(window)
+    values = averaged_attributes(source, attributes)[::-1] if len(source) else np.empty(0)
+    states = macd_states(values, window, fast_window, signal_window) if values.size else np.empty((0, 3))
+
+    oldest = states[:max(values.size - lookback + 1, 0)]
+    seeds = np.stack([values, values, np.zeros(values.size)], axis=1)[:oldest.shape[0]]
+    states[lookback - 1:] -= (oldest - seeds) @ macd_propagator(window, fast_window, signal_window).T
+
+    lines = np.stack([states[:, 0] - states[:, 1], states[:, 2]], axis=1)
+    lines[:window - 1] = np.nan
+    return IndicatorColumn(macd, source, lines[::-1], lookback, window, attributes, fast_window=fast_window,
+                           signal_window=signal_window)
+
+
+class MovingAverageConvergenceDivergence(StreamingIndicator):
+
+    """
+    Streaming version of macd. The fast and slow averages and the signal line are updated recursively, and the
+    recursive state of the oldest lookback point is kept to correct the value for the seed of macd, see
+    macd_propagator
+    """
+
+    def __init__(self, window, attributes, fast_window=12, signal_window=9):
+        super().__init__(window, attributes)
+        self.alphas = 2 / (fast_window + 1), 2 / (window + 1), 2 / (signal_window + 1)
+        self.propagator = macd_propagator(window, fast_window, signal_window)
+        self.fast = None
+        self.slow = None
+        self.signal = None
+        self.history = deque(maxlen=macd_lookback(window))
+        self.count = 0
+
+    def push(self, x):
+        fast_alpha, slow_alpha, signal_alpha = self.alphas
+        if self.count == 0:
+            self.fast = self.slow = x
+            self.signal = 0.
+        else:
+            self.fast = x * fast_alpha + self.fast * (1 - fast_alpha)
+            self.slow = x * slow_alpha + self.slow * (1 - slow_alpha)
+            self.signal = (self.fast - self.slow) * signal_alpha + self.signal * (1 - signal_alpha)
+        self.history.append((x, self.fast, self.slow, self.signal))
+        self.count += 1
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return TooSmallWindowException
+        fast, slow, signal = self.fast, self.slow, self.signal
+        if len(self.history) == self.history.maxlen:
+            x, oldest_fast, oldest_slow, oldest_signal = self.history[0]
+            propagator = self.propagator
+            fast -= propagator[0, 0] * (oldest_fast - x)
+            slow -= propagator[1, 1] * (oldest_slow - x)
+            signal -= propagator[2, 0] * (oldest_fast - x) + propagator[2, 1] * (oldest_slow - x) + \
+                propagator[2, 2] * oldest_signal
+        return fast - slow, signal
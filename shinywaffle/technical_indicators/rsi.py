@@ -1,7 +1,9 @@
-from data.time_series_data import TimeSeries
-from technical_indicators import TooSmallWindowException
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, averaged_windows, padded
 import numpy as np
 import math as m
+from collections import deque
 
 
 def rsi(data_series, window, attributes, offset=0):
@@ -26,7 +28,7 @@ def rsi(data_series, window, attributes, offset=0):
     # Window is extended by 1 in order to calculate the up- or downwards movement in the "window" last time steps
     for attrib in attributes:
         assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
-        arrays.append(np.array(getattr(data_series, attrib)[offset:offset + window+1]))
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window+1]))
 
     avg_array = sum(arrays) / len(arrays)
 
@@ -57,3 +59,121 @@ def rsi(data_series, window, attributes, offset=0):
         return rsi_value
     else:
         return TooSmallWindowException
+
+
+def rsi_lookback(window, offset=0):
+    """
+    The window changes from offset on need one point more than the window
+    :return: number of data points
+    """
+    return window + 1 + offset
+
+
+def rsi_column(data_series, window, attributes):
+    """
+    The mean gain and loss of the changes in all windows of window + 1 points
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    windows = averaged_windows(source, window + 1, attributes)
+    changes = windows[:, :-1] - windows[:, 1:]
+
+    # Like in rsi, the gains and losses are averaged over window + 1 elements where the last one is always 0
+    gains = np.zeros(windows.shape)
+    losses = np.zeros(windows.shape)
+    gains[:, :-1] = np.where(changes > 0, changes, 0)
+    losses[:, :-1] = np.where(changes < 0, -1 * changes, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.mean(gains, axis=1) / np.mean(losses, axis=1)
+        rsi_values = np.where(np.isnan(rs), 0, 100 - (100 / (1 + rs)))
+
+    values = padded(rsi_values, len(source))
+    return IndicatorColumn(rsi, source, values, rsi_lookback(window), window, attributes)
+
+
+class RelativeStrengthIndex(StreamingIndicator):
+
+    """
+    Streaming version of rsi. By default the gains and losses are averaged over the changes between the window + 1
+    latest values, like the function. They are kept as running sums along with the number of gains and losses, so a
+    window without losses (or gains) is detected exactly.
+
+    With wilder=True the RSI is Wilder's instead, which is not the same as the function: the average gain and loss
+    are seeded with the simple average of the first window changes, and after that updated with
+    avg = (avg * (window - 1) + change) / window.
+    """
+
+    def __init__(self, window, attributes, wilder=False):
+        """
+        :param wilder: If True, the averages are smoothed recursively over the entire history (Wilder's RSI)
+        """
+        super().__init__(window, attributes)
+        self.wilder = wilder
+        self.previous = None
+        self.num_values = 0
+        self.num_pushed = 0
+        self.changes = deque()
+        self.total_gain = 0.
+        self.total_loss = 0.
+        self.num_gains = 0
+        self.num_losses = 0
+        self.avg_gain = 0.
+        self.avg_loss = 0.
+
+    def push(self, x):
+        self.num_values = min(self.num_values + 1, self.window + 1)
+        if self.previous is None:
+            self.previous = x
+            return
+
+        change = x - self.previous
+        self.previous = x
+        self.num_pushed += 1
+        if self.wilder:
+            self.push_wilder(change)
+            return
+
+        self.changes.append(change)
+        self.add_change(change, 1)
+        if len(self.changes) > self.window:
+            self.add_change(self.changes.popleft(), -1)
+
+        if self.num_pushed % self.window == 0:
+            self.total_gain = m.fsum(c for c in self.changes if c > 0)
+            self.total_loss = m.fsum(-c for c in self.changes if c < 0)
+
+    def push_wilder(self, change):
+        gain = max(change, 0.)
+        loss = max(-change, 0.)
+        if self.num_pushed <= self.window:
+            self.avg_gain += gain / self.window
+            self.avg_loss += loss / self.window
+        else:
+            self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+            self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+
+    def add_change(self, change, sign):
+        if change > 0:
+            self.total_gain += sign * change
+            self.num_gains += sign
+        elif change < 0:
+            self.total_loss -= sign * change
+            self.num_losses += sign
+
+    @property
+    def value(self):
+        if self.wilder:
+            if self.num_pushed < self.window:
+                return TooSmallWindowException
+            if self.avg_loss == 0:
+                return 100. if self.avg_gain > 0 else 0.
+            return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+        if self.num_values < self.window:
+            return TooSmallWindowException
+        if self.num_losses == 0:
+            return 100. if self.num_gains else 0.
+        if self.num_gains == 0:
+            return 0.
+        return 100 - (100 / (1 + self.total_gain / self.total_loss))
@@ -1,5 +1,8 @@
-from shinywaffle.technical_indicators import TooSmallWindowException
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    IndicatorGrid, source_series, averaged_windows, averaged_attributes, padded
+from collections import deque
 import numpy as np
+import math as m
 
 
 def simple_moving_average(data_series, window, attributes, offset=0):
@@ -18,7 +21,7 @@ def simple_moving_average(data_series, window, attributes, offset=0):
     arrays = []
     for attrib in attributes:
         assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
-        arrays.append(np.array(getattr(data_series, attrib)[offset:offset + window]))
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
 
     avg_array = sum(arrays) / len(arrays)
     moving_average = np.mean(avg_array)
@@ -27,3 +30,89 @@ def simple_moving_average(data_series, window, attributes, offset=0):
     else:
         return TooSmallWindowException
 
+
+def simple_moving_average_lookback(window, offset=0):
+    """
+    The window points from offset on are averaged
+    :return: number of data points
+    """
+    return window + offset
+
+
+def simple_moving_average_column(data_series, window, attributes):
+    """
+    The means of all windows of the series, from a sliding window view
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    windows = averaged_windows(source, window, attributes)
+    values = padded(np.mean(windows, axis=1), len(source))
+    return IndicatorColumn(simple_moving_average, source, values, simple_moving_average_lookback(window),
+                           window, attributes)
+
+
+class SimpleMovingAverageGrid(IndicatorGrid):
+
+    """
+    Simple moving averages for a grid of windows, computed from one cumulative sum of the series. The mean of the
+    window at offset i is (S[i + window] - S[i]) / window, so a whole grid of windows is a single vectorized
+    subtraction. The series is centred on its mean before it is summed to keep the rounding errors of the cumulative
+    sum small, but the values can still differ from simple_moving_average in the last digits.
+    """
+
+    def __init__(self, data_series, attributes):
+        super().__init__(simple_moving_average, simple_moving_average_lookback, source_series(data_series),
+                         attributes)
+        avg_array = averaged_attributes(self.source, attributes) if len(self.source) else np.empty(0)
+        self.centre = np.mean(avg_array) if avg_array.size else 0.
+        self.cumsum = np.zeros(avg_array.size + 1)
+        np.cumsum(avg_array - self.centre, out=self.cumsum[1:])
+
+    def compute(self, windows):
+        size = self.cumsum.size - 1
+        start = np.arange(size)
+        end = start[np.newaxis, :] + windows[:, np.newaxis]
+        values = (self.cumsum[np.minimum(end, size)] - self.cumsum[start]) / windows[:, np.newaxis] + self.centre
+        values[end > size] = np.nan
+        return values
+
+
+def simple_moving_average_grid(data_series, windows, attributes):
+    """
+    Simple moving averages for a grid of windows, see SimpleMovingAverageGrid
+    :param windows: list of windows
+    :return: SimpleMovingAverageGrid. grid.column(window) returns the IndicatorColumn of a window
+    """
+    grid = SimpleMovingAverageGrid(data_series, attributes)
+    grid.add(*windows)
+    return grid
+
+
+class SimpleMovingAverage(StreamingIndicator):
+
+    """
+    Streaming simple moving average kept as a running sum over the values in the window, resummed with math.fsum
+    every window pushes
+    """
+
+    def __init__(self, window, attributes):
+        super().__init__(window, attributes)
+        self.values = deque()
+        self.total = 0.
+        self.num_pushed = 0
+
+    def push(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+        self.num_pushed += 1
+        if self.num_pushed % self.window == 0:
+            self.total = m.fsum(self.values)
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return TooSmallWindowException
+        return self.total / self.window
@@ -0,0 +1,92 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, padded
+from shinywaffle.technical_indicators.donchian_channels import DonchianChannels
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+
+
+def stochastic_oscillator(data_series, window, attributes=None, offset=0):
+    """
+    Stochastic oscillator (%K), where the latest close is in the range of the last window points:
+    100 * (close - lowest low) / (highest high - lowest low). If the range is empty, 50 is returned
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the look back window
+    :param attributes: names of the high, low and close attributes. Defaults to ['high', 'low', 'close']
+    :param offset: the offset of the start of the window
+    :return: the stochastic oscillator as a float between 0 and 100
+    """
+
+    assert isinstance(data_series, TimeSeries)
+
+    if attributes is None:
+        attributes = ['high', 'low', 'close']
+
+    arrays = []
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
+
+    high, low, close = arrays
+    if high.size >= window:
+        return stochastic_value(close[0], np.max(high), np.min(low))
+    else:
+        return TooSmallWindowException
+
+
+def stochastic_value(close, highest, lowest):
+    if highest == lowest:
+        return 50.
+    return 100 * (close - lowest) / (highest - lowest)
+
+
+def stochastic_oscillator_lookback(window, offset=0):
+    """
+    The close at offset is placed in the range of the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def stochastic_oscillator_column(data_series, window, attributes=None):
+    """
+    The close within the rolling range of the highs and lows, 50 where the range is empty like in
+    stochastic_oscillator
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    high, low, close = [np.asarray(getattr(source, a)) for a in (attributes or ['high', 'low', 'close'])]
+    if high.size >= window:
+        highest = np.max(sliding_window_view(high, window), axis=1)
+        lowest = np.min(sliding_window_view(low, window), axis=1)
+        close = close[:highest.size]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(highest == lowest, 50., 100 * (close - lowest) / (highest - lowest))
+    else:
+        values = np.empty(0)
+    return IndicatorColumn(stochastic_oscillator, source, padded(values, len(source)),
+                           stochastic_oscillator_lookback(window), window, attributes)
+
+
+class StochasticOscillator(StreamingIndicator):
+
+    """
+    Streaming stochastic oscillator (%K). The highest high and the lowest low are kept with DonchianChannels
+    """
+
+    def __init__(self, window, attributes=None):
+        super().__init__(window, attributes if attributes is not None else ['high', 'low', 'close'])
+        self.channels = DonchianChannels(window)
+        self.close = None
+
+    def push_point(self, data_point):
+        high, low, self.close = [getattr(data_point, a) for a in self.attributes]
+        self.channels.push_high_low(high, low)
+
+    @property
+    def value(self):
+        channels = self.channels.value
+        if channels is TooSmallWindowException:
+            return TooSmallWindowException
+        return stochastic_value(self.close, *channels)
@@ -0,0 +1,92 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, StreamingIndicator, IndicatorColumn, \
+    source_series, averaged_attributes, padded
+from shinywaffle.technical_indicators.simple_moving_average import SimpleMovingAverage
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+
+
+def vwap(data_series, window, attributes, offset=0, volume='volume'):
+    """
+    Rolling volume weighted average price of the last window points. If there is no volume in the window, nan is
+    returned
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the look back window
+    :param attributes: list of price attributes that are averaged, e.g. ['high', 'low', 'close'] for the typical price
+    :param offset: the offset of the start of the window
+    :param volume: name of the volume attribute
+    :return: the VWAP as a float
+    """
+
+    assert isinstance(data_series, TimeSeries)
+    assert isinstance(attributes, list) or isinstance(attributes, str)
+
+    if type(attributes) != list:
+        attributes = [attributes]
+
+    arrays = []
+    for attrib in attributes + [volume]:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
+
+    volumes = arrays.pop()
+    price_volume = sum(arrays) / len(arrays) * volumes
+    if volumes.size >= window:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sum(price_volume) / np.sum(volumes)
+    else:
+        return TooSmallWindowException
+
+
+def vwap_lookback(window, offset=0):
+    """
+    The prices are weighted with the volumes of the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def vwap_column(data_series, window, attributes, volume='volume'):
+    """
+    The sums of price * volume and of the volume over all windows of the series, from sliding window views
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    volumes = np.asarray(getattr(source, volume))
+    if volumes.size >= window:
+        price_volume = averaged_attributes(source, attributes) * volumes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.sum(sliding_window_view(price_volume, window), axis=1) / \
+                     np.sum(sliding_window_view(volumes, window), axis=1)
+    else:
+        values = np.empty(0)
+    return IndicatorColumn(vwap, source, padded(values, len(source)), vwap_lookback(window), window, attributes,
+                           volume=volume)
+
+
+class VolumeWeightedAveragePrice(StreamingIndicator):
+
+    """
+    Streaming rolling VWAP, kept as running sums of price * volume and of the volume over the window
+    """
+
+    def __init__(self, window, attributes, volume='volume'):
+        super().__init__(window, attributes)
+        self.volume = volume
+        self.price_volume = SimpleMovingAverage(window, [])
+        self.volumes = SimpleMovingAverage(window, [])
+
+    def push_point(self, data_point):
+        volume = getattr(data_point, self.volume)
+        price = sum(getattr(data_point, a) for a in self.attributes) / len(self.attributes)
+        self.price_volume.push(price * volume)
+        self.volumes.push(volume)
+
+    @property
+    def value(self):
+        if self.volumes.value is TooSmallWindowException:
+            return TooSmallWindowException
+        if self.volumes.total == 0:
+            return np.nan
+        return self.price_volume.total / self.volumes.total
@@ -0,0 +1,76 @@
+from shinywaffle.data.time_series_data import TimeSeries
+from shinywaffle.technical_indicators import TooSmallWindowException, IndicatorColumn, source_series, \
+    averaged_windows, padded
+from shinywaffle.technical_indicators.bollinger_bands import BollingerBands
+import numpy as np
+
+
+def z_score(data_series, window, attributes, offset=0):
+    """
+    Rolling z-score, the number of (population) standard deviations the latest value is from the mean of the last
+    window points. If all values in the window are equal, 0 is returned
+
+    :param data_series: a DataSeries object containing the time series data
+    :param window: the look back window
+    :param attributes: list of attributes that should be used (and averaged) to calculate the z-score
+    :param offset: the offset of the start of the window
+    :return: the z-score as a float
+    """
+
+    assert isinstance(data_series, TimeSeries)
+    assert isinstance(attributes, list) or isinstance(attributes, str)
+
+    if type(attributes) != list:
+        attributes = [attributes]
+
+    arrays = []
+    for attrib in attributes:
+        assert hasattr(data_series[0], attrib), "{} is not an attribute in the data series".format(attrib)
+        arrays.append(np.asarray(getattr(data_series, attrib)[offset:offset + window]))
+
+    avg_array = sum(arrays) / len(arrays)
+    if avg_array.size >= window:
+        if np.ptp(avg_array) == 0:
+            return 0.
+        return (avg_array[0] - np.mean(avg_array)) / np.std(avg_array)
+    else:
+        return TooSmallWindowException
+
+
+def z_score_lookback(window, offset=0):
+    """
+    The point at offset is scored against the window points from offset on
+    :return: number of data points
+    """
+    return window + offset
+
+
+def z_score_column(data_series, window, attributes):
+    """
+    The z-score of the newest point of all windows of the series, 0 for a flat window like in z_score
+    :return: IndicatorColumn
+    """
+    source = source_series(data_series)
+    windows = averaged_windows(source, window, attributes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(np.ptp(windows, axis=1) == 0, 0.,
+                          (windows[:, 0] - np.mean(windows, axis=1)) / np.std(windows, axis=1))
+    return IndicatorColumn(z_score, source, padded(values, len(source)), z_score_lookback(window),
+                           window, attributes)
+
+
+class ZScore(BollingerBands):
+
+    """
+    Streaming rolling z-score. The mean and variance of the window are kept like in BollingerBands
+    """
+
+    def __init__(self, window, attributes):
+        super().__init__(window, attributes)
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return TooSmallWindowException
+        std_dev = self.std_dev
+        return 0. if std_dev == 0 else (self.values[-1] - self.mean) / std_dev
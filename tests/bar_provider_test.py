@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from shinywaffle.data.bar_provider import BarProvider
+
+from conftest import bars_frame, write_bars_csv
+
+
+def write_parquet(df, path):
+    pytest.importorskip('pyarrow')
+    # Small row groups, so that the date filter skips some of them
+    df.to_parquet(path, row_group_size=10)
+
+
+def write_feather(df, path):
+    pytest.importorskip('pyarrow')
+    df.to_feather(path)
+
+
+def write_npz(df, path):
+    np.savez(path, **{name: df[name].to_numpy() for name in df.columns})
+
+
+writers = {'.parquet': write_parquet, '.feather': write_feather, '.npz': write_npz}
+
+date_ranges = [
+    (None, None),
+    (datetime(2020, 1, 15), None),
+    (None, datetime(2020, 3, 1)),
+    (datetime(2020, 1, 15), datetime(2020, 3, 1)),
+    (datetime(2021, 1, 1), None),
+]
+
+
+def assert_same_bars(bars, expected):
+    assert len(bars) == len(expected)
+    for name, column in expected.columns.items():
+        assert np.array_equal(bars.columns[name], column), name
+
+
+@pytest.mark.parametrize('extension', sorted(writers))
+@pytest.mark.parametrize('date_from, date_to', date_ranges)
+def test_readers_match_csv(tmp_path, extension, date_from, date_to):
+    df = bars_frame(100)
+    csv_path = write_bars_csv(tmp_path / 'bars.csv', 100)
+    path = str(tmp_path / ('bars' + extension))
+    writers[extension](df, path)
+
+    expected = BarProvider(csv_path, '%Y-%m-%d', columnar=True, date_from=date_from, date_to=date_to)
+    bars = BarProvider(path, columnar=True, date_from=date_from, date_to=date_to)
+    assert_same_bars(bars, expected)
+
+    # The readers filter the rows themselves, before the DataFrame is built
+    assert len(getattr(BarProvider, BarProvider.readers[extension])(path, date_from, date_to)) == len(expected)
+
+    if date_from is not None:
+        assert len(bars) == 0 or bars.columns['time'][-1] >= np.datetime64(date_from)
+    if date_to is not None:
+        assert len(bars) == 0 or bars.columns['time'][0] <= np.datetime64(date_to)
+
+
+def test_npz_with_string_dates(tmp_path):
+    # The Date array can not be sliced before the conversion, so the bars are filtered after the dates are parsed
+    df = bars_frame(100)
+    path = str(tmp_path / 'bars.npz')
+    columns = {name: df[name].to_numpy() for name in df.columns}
+    columns['Date'] = df['Date'].dt.strftime('%Y-%m-%d').to_numpy(dtype=str)
+    np.savez(path, **columns)
+
+    date_from, date_to = datetime(2020, 1, 15), datetime(2020, 3, 1)
+    bars = BarProvider(path, '%Y-%m-%d', columnar=True, date_from=date_from, date_to=date_to)
+    assert_same_bars(bars, BarProvider(path, '%Y-%m-%d', columnar=True).retrieve(datetime(2020, 1, 14), date_to))
+    assert len(bars) == 47
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from shinywaffle.backtesting import orders
+from shinywaffle.backtesting.broker import BacktestBroker
+from shinywaffle.backtesting.fill_models import SimulatedPathFillModel, VectorizedPathFillModel, \
+    BrownianBridgeFillModel
+from shinywaffle.common.context import Context
+from shinywaffle.common.event import events
+from shinywaffle.data.time_series_data import TimeSeriesView
+
+from conftest import make_series, add_asset
+
+fill_models = [SimulatedPathFillModel, VectorizedPathFillModel, BrownianBridgeFillModel]
+
+
+def make_broker(columnar, fill_model=None):
+    """
+    A broker with one asset whose retrieved bars end at 2020-01-03 (open 102, high 103, low 101)
+    """
+    context = Context()
+    broker = BacktestBroker(context, 0.01, fill_model=fill_model)
+    asset = add_asset(context, 'TEST', make_series(np.arange(5), columnar, closes=100.5 + np.arange(5)))
+
+    view = TimeSeriesView(asset.bars)
+    view.advance(datetime(2020, 1, 3))
+    context.retrieved_data[asset.ticker]['bars'] = view
+    context.retrieved_data.time = datetime(2020, 1, 3)
+    return broker, asset
+
+
+@pytest.mark.parametrize('fill_model', fill_models)
+@pytest.mark.parametrize('columnar', [True, False])
+def test_match_limit_orders(columnar, fill_model):
+    random.seed(0)
+    np.random.seed(0)
+    broker, asset = make_broker(columnar, fill_model())
+    time = datetime(2020, 1, 2)
+    inside_buy = broker.place_order(orders.LimitBuyOrder(asset, 2, 101.5, time)).order_id
+    inside_sell = broker.place_order(orders.LimitSellOrder(asset, 1, 102.5, time)).order_id
+    below = broker.place_order(orders.LimitBuyOrder(asset, 2, 100.5, time)).order_id
+
+    filled = broker.match_limit_orders()
+
+    assert [e.order_volume for e in filled] == [2, 1]
+    assert all(isinstance(e, events.OrderFilledEvent) for e in filled)
+    assert 101 <= filled[0].price <= 101.5
+    assert 102.5 <= filled[1].price <= 103
+    assert filled[0].commission == pytest.approx(0.01 * filled[0].order_size)
+
+    # Only the order below the bar is still pending
+    assert broker.order_book.get_by_id(inside_buy) is None
+    assert broker.order_book.get_by_id(inside_sell) is None
+    assert broker.order_book.get_by_id(below) is not None
+    assert broker.order_book.get_by_asset('TEST') == [broker.order_book.get_by_id(below)]
+
+
+@pytest.mark.parametrize('fill_model', fill_models)
+def test_match_limit_orders_at_bar_boundaries(fill_model):
+    np.random.seed(0)
+    random.seed(0)
+    broker, asset = make_broker(True, fill_model())
+    time = datetime(2020, 1, 2)
+    at_low = broker.place_order(orders.LimitBuyOrder(asset, 1, 101., time)).order_id
+    broker.place_order(orders.LimitBuyOrder(asset, 1, 100.99, time))
+    at_high = broker.place_order(orders.LimitSellOrder(asset, 1, 103., time)).order_id
+    broker.place_order(orders.LimitSellOrder(asset, 1, 103.01, time))
+
+    # The limit prices at the low and the high are reached, the ones just outside the bar are not
+    filled = broker.match_limit_orders()
+    assert [(e.side, e.price) for e in filled] == [('buy', 101.), ('sell', 103.)]
+    assert broker.order_book.get_by_id(at_low) is None
+    assert broker.order_book.get_by_id(at_high) is None
+    assert len(broker.order_book.limit_books['TEST']) == 2
+
+
+def test_match_limit_orders_of_assets_with_new_bar():
+    np.random.seed(0)
+    broker, asset = make_broker(True, BrownianBridgeFillModel())
+    time = datetime(2020, 1, 2)
+    order_id = broker.place_order(orders.LimitBuyOrder(asset, 1, 101.5, time)).order_id
+
+    # The asset has no new bar, so its order is not matched against the latest bar again
+    assert broker.match_limit_orders(tickers=set()) == []
+    assert broker.match_limit_orders(tickers={'OTHER'}) == []
+    assert broker.order_book.get_by_id(order_id) is not None
+
+    # Orders placed after the match event was created are not matched
+    assert broker.match_limit_orders(tickers={'TEST'}, latest_id=order_id) == []
+    assert [e.order_volume for e in broker.match_limit_orders(tickers={'TEST'}, latest_id=order_id + 1)] == [1]
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_check_for_order_fill(columnar):
+    broker, asset = make_broker(columnar, VectorizedPathFillModel())
+    broker.slippages = [0.]
+    market = broker.place_order(orders.MarketBuyOrder(asset, 1, datetime(2020, 1, 2))).order_id
+    limit = broker.place_order(orders.LimitSellOrder(asset, 1, 101.5, datetime(2020, 1, 2))).order_id
+
+    assert broker.check_for_order_fill(market).price == 102.
+    assert 101.5 <= broker.check_for_order_fill(limit).price <= 103
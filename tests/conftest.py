@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from shinywaffle.common.assets import assets
+from shinywaffle.data.time_series_data import time_series_from_columns, sort_columns
+
+
+def make_series(days, columnar, opens=None, closes=None, spread=1.):
+    """
+    :param days: The days of the bars after 2020-01-01
+    :param columnar: If True, a ColumnarTimeSeries is returned
+    :param opens: The open of each bar, 100, 101, 102 etc. by default
+    :param closes: The close of each bar, the open by default
+    :param spread: Distance of the high and the low from the open
+    :return: TimeSeries with the bars, newest first
+    """
+    opens = 100. + np.arange(len(days)) if opens is None else np.asarray(opens, dtype=float)
+    return time_series_from_columns(sort_columns({
+        'time': (np.datetime64('2020-01-01') + np.asarray(days)).astype('datetime64[us]'), 'open': opens,
+        'close': opens if closes is None else np.asarray(closes, dtype=float), 'high': opens + spread,
+        'low': opens - spread, 'volume': np.ones(opens.size, int)
+    }), columnar)
+
+
+def add_asset(context, ticker, bars):
+    asset = assets.Stock(context, ticker, ticker, assets.USD())
+    asset.set_bars(bars)
+    return asset
+
+
+def bars_frame(size=50):
+    """
+    :return: DataFrame with the columns of a bar file and daily bars from 2020-01-01. The prices are in steps of 0.25,
+    so they are read back exactly from a CSV file
+    """
+    dates = pd.date_range('2020-01-01', periods=size, freq='D')
+    opens = 100. + np.random.RandomState(0).randint(-4, 5, size).cumsum() / 4
+    return pd.DataFrame({'Date': dates, 'Open': opens, 'High': opens + 1, 'Low': opens - 1, 'Close': opens + 0.5,
+                         'Volume': np.arange(size) + 1})
+
+
+def write_bars_csv(path, size=50):
+    df = bars_frame(size)
+    df.assign(Date=df['Date'].dt.strftime('%Y-%m-%d')).to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from shinywaffle.common.context import Context
+from shinywaffle.technical_indicators.cross_section import cross_section, CrossSection
+from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average_column
+
+from conftest import make_series, add_asset
+
+
+def make_context(columnar):
+    context = Context()
+    add_asset(context, 'A', make_series([0, 1, 2, 3, 4], columnar, [1., 2., 3., 4., 5.]))
+    add_asset(context, 'B', make_series([0, 2, 4], columnar, [3., 3., 1.]))
+    add_asset(context, 'C', make_series([1, 2, 3, 4], columnar, [3., 3., 3., 3.]))
+    return context
+
+
+def day(n):
+    return datetime(2020, 1, 1) + timedelta(days=n)
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_cross_section_is_aligned_without_lookahead(columnar):
+    section = cross_section(make_context(columnar), 'close')
+    assert section.tickers == ['A', 'B', 'C']
+    assert section.times.tolist() == [day(n) for n in range(5)]
+
+    # B carries its latest value forward and C has no value before its first point
+    assert np.array_equal(section.matrix, [[1., 2., 3., 4., 5.],
+                                           [3., 3., 3., 3., 1.],
+                                           [np.nan, 3., 3., 3., 3.]], equal_nan=True)
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_cross_section_of_column(columnar):
+    context = make_context(columnar)
+    section = cross_section(context, simple_moving_average_column, 2, ['close'])
+    assert section.at('A', day(1)) == 1.5
+    assert section.at('A', day(4)) == 4.5
+    assert section.at('B', day(3)) == 3.
+    assert np.isnan(section.at(context.assets['C'], day(1)))
+
+
+def test_cross_section_of_data_series():
+    context = make_context(True)
+    for ticker, closes in (('A', [5., 6.]), ('C', [7., 8.])):
+        context.assets[ticker].add_data_series('minute', make_series([1, 3], True, closes), '1min')
+
+    # B has no minute series, so it has no values
+    section = cross_section(context, 'close', series='minute')
+    assert section.times.tolist() == [day(1), day(3)]
+    assert np.array_equal(section.matrix, [[5., 6.], [np.nan, np.nan], [7., 8.]], equal_nan=True)
+
+
+def test_rank():
+    section = cross_section(make_context(True), 'close')
+    ranks = section.rank()
+    assert np.array_equal(ranks.matrix, [[1., 1., 2., 3., 3.],
+                                         [2., 2.5, 2., 1.5, 1.],
+                                         [np.nan, 2.5, 2., 1.5, 2.]], equal_nan=True)
+    assert np.array_equal(section.rank(descending=True).matrix[:, 4], [1., 3., 2.])
+
+    # The transforms are cached
+    assert section.rank() is ranks
+    assert section.rank(descending=True) is not ranks
+
+
+def test_normalise():
+    section = cross_section(make_context(True), 'close')
+    z_scores = section.normalise().matrix
+
+    assert z_scores[0, 0] == pytest.approx(-1.)
+    assert z_scores[1, 0] == pytest.approx(1.)
+    assert np.isnan(z_scores[2, 0])
+    assert np.allclose(np.nanmean(z_scores, axis=0), 0.)
+    assert np.allclose(np.nanstd(z_scores[:, [0, 1, 3, 4]], axis=0), 1.)
+
+    # All assets have the same value on day 2
+    assert z_scores[:, 2].tolist() == [0., 0., 0.]
+
+
+def test_time_index():
+    times = np.datetime64('2020-01-01') + np.arange(0, 20, 2)
+    section = CrossSection(['A'], times.astype('datetime64[us]'), np.arange(10.)[None, :])
+
+    def expected(time):
+        return int(np.searchsorted(section.times, np.datetime64(time, 'us'), side='right')) - 1
+
+    # Steps of one, jumps of several times, lookups between the times, going back in time, and before the first time
+    lookups = [day(-1), day(0), day(1), day(2), day(3), day(4), day(10), day(11), day(18), day(30), day(6),
+               day(5), day(-3), day(8), day(8), day(12), day(0)]
+    for time in lookups:
+        index = expected(time)
+        assert section.time_index(time) == index
+        assert section.at('A', time) == index if index >= 0 else np.isnan(section.at('A', time))
+
+    random = np.random.RandomState(0)
+    for n in random.randint(-5, 25, 200):
+        assert section.time_index(day(int(n))) == expected(day(int(n)))
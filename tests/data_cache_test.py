@@ -0,0 +1,116 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from shinywaffle.data.bar_provider import BarProvider
+from shinywaffle.data.data_cache import DataCache
+
+from conftest import write_bars_csv
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DataCache(str(tmp_path / 'cache'))
+
+
+def entries(cache):
+    return sorted(os.listdir(cache.path))
+
+
+def test_miss_then_hit(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    options = {'reader': 'test'}
+    assert cache.load(path, options) is None
+
+    cache.store(path, options, {'time': np.arange(3), 'close': np.array([1., 2., 3.])})
+    columns = cache.load(path, options)
+    assert columns['close'].tolist() == [1., 2., 3.]
+    assert columns['time'].tolist() == [0, 1, 2]
+
+    # Other parse options are another entry
+    assert cache.load(path, {'reader': 'other'}) is None
+
+
+def test_columns_are_memory_mapped(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    cache.store(path, {}, {'close': np.array([1., 2., 3.])})
+    close = cache.load(path, {})['close']
+    assert isinstance(close, np.memmap)
+    assert not close.flags.writeable
+
+
+def test_bar_provider_loads_from_cache(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    parsed = BarProvider(path, '%Y-%m-%d', columnar=True, cache=cache)
+    assert len(entries(cache)) == 1
+
+    cached = BarProvider(path, '%Y-%m-%d', columnar=True, cache=cache)
+    for name, column in parsed.columns.items():
+        assert np.array_equal(cached.columns[name], column)
+    assert len(entries(cache)) == 1
+
+
+def test_changed_source_invalidates_entry(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    cache.store(path, {}, {'close': np.array([1.])})
+    old_entries = entries(cache)
+
+    write_bars_csv(tmp_path / 'bars.csv', size=60)
+    assert cache.load(path, {}) is None
+
+    # Storing the new version removes the entry of the old version
+    cache.store(path, {}, {'close': np.array([2.])})
+    assert cache.load(path, {})['close'].tolist() == [2.]
+    assert len(entries(cache)) == 1
+    assert entries(cache) != old_entries
+
+
+def test_entries_with_other_options_are_kept(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    cache.store(path, {'reader': 'a'}, {'close': np.array([1.])})
+    cache.store(path, {'reader': 'b'}, {'close': np.array([2.])})
+
+    assert cache.load(path, {'reader': 'a'})['close'].tolist() == [1.]
+    assert cache.load(path, {'reader': 'b'})['close'].tolist() == [2.]
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path, cache):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    cache.store(path, {}, {'close': np.array([1.])})
+    entry = os.path.join(cache.path, cache.key(path, {}))
+    os.remove(os.path.join(entry, 'close.npy'))
+    assert cache.load(path, {}) is None
+
+    cache.store(path, {}, {'close': np.array([1.])})
+    assert cache.load(path, {})['close'].tolist() == [1.]
+
+
+def test_other_sources_are_kept(tmp_path, cache):
+    os.makedirs(tmp_path / 'other')
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    other_path = write_bars_csv(tmp_path / 'other' / 'bars.csv')
+    cache.store(path, {}, {'close': np.array([1.])})
+    cache.store(other_path, {}, {'close': np.array([2.])})
+
+    assert cache.load(path, {})['close'].tolist() == [1.]
+    assert cache.load(other_path, {})['close'].tolist() == [2.]
+
+
+def test_date_ranges_are_cached_side_by_side(tmp_path, cache, monkeypatch):
+    path = write_bars_csv(tmp_path / 'bars.csv')
+    ranges = [(None, None), (datetime(2020, 1, 10), None), (datetime(2020, 1, 5), datetime(2020, 1, 20))]
+    parsed = [BarProvider(path, '%Y-%m-%d', columnar=True, cache=cache, date_from=date_from, date_to=date_to)
+              for date_from, date_to in ranges]
+    assert [len(bars) for bars in parsed] == [50, 41, 16]
+    assert len(entries(cache)) == 3
+
+    # All ranges are loaded from the cache without reading the file again
+    def read_csv(path, date_from, date_to):
+        raise AssertionError('The bars should be loaded from the cache')
+
+    monkeypatch.setattr(BarProvider, 'read_csv', staticmethod(read_csv))
+    for (date_from, date_to), bars in zip(ranges, parsed):
+        cached = BarProvider(path, '%Y-%m-%d', columnar=True, cache=cache, date_from=date_from, date_to=date_to)
+        assert np.array_equal(cached.close, bars.close)
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from shinywaffle.common.context import Context
+from shinywaffle.data.data_provider import BacktestDataProvider, BacktestCompleteException, LiveDataProvider
+from shinywaffle.data.time_series_data import BoundedTimeSeries
+from shinywaffle.strategy.strategy import TradingStrategy
+from shinywaffle.tools.api_link import APILink
+
+from conftest import make_series, add_asset
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_assets_are_scheduled_by_next_point(columnar):
+    context = Context()
+    bar_days = {
+        'DAILY': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+        'SPARSE': [0, 3, 6, 9],
+        'LATE': [7, 8, 9],
+        'EXTRA': [1, 5]
+    }
+    for ticker, days in bar_days.items():
+        add_asset(context, ticker, make_series(days, columnar))
+
+    # The extra series is scheduled with the bars of its asset
+    minute_days = [2, 4, 6]
+    context.assets['EXTRA'].add_data_series('minute', make_series(minute_days, columnar), '1min')
+    timelines = dict(bar_days, EXTRA=sorted(bar_days['EXTRA'] + minute_days))
+
+    # The steps skip days 4 and 5, so the points of these days arrive together with day 6
+    days = [0, 1, 2, 3, 6, 7, 8, 9, 10]
+    provider = BacktestDataProvider(context, [datetime(2020, 1, 1) + timedelta(days=d) for d in days])
+    previous = -1
+    for day in days:
+        events = provider.retrieve_time_series_data()
+        expected = [t for t, points in timelines.items() if any(previous < d <= day for d in points)]
+        assert [e.asset.ticker for e in events] == expected
+        assert context.retrieved_data.time == datetime(2020, 1, 1) + timedelta(days=day)
+
+        # Only the assets with points after the step are in the schedule, once each
+        assert sorted(asset_no for _, asset_no in provider.schedule) == \
+            [i for i, points in enumerate(timelines.values()) if points[-1] > day]
+        for ticker, points in bar_days.items():
+            assert len(context.retrieved_data[ticker]['bars']) == len([d for d in points if d <= day])
+        assert len(context.retrieved_data['EXTRA']['minute']) == len([d for d in minute_days if d <= day])
+        previous = day
+
+    with pytest.raises(BacktestCompleteException):
+        provider.retrieve_time_series_data()
+
+
+class FakeLink(APILink):
+
+    """
+    Returning the size latest bars, with one new bar per fetch, like an API returning a fixed number of bars
+    """
+
+    def __init__(self, size):
+        super().__init__('fake')
+        self.size = size
+        self.fetched = 0
+
+    def fetch(self):
+        self.fetched += 1
+        return make_series(list(range(self.fetched - 1, self.fetched - 1 + self.size)), False)
+
+
+class LookbackStrategy(TradingStrategy):
+
+    def lookback(self):
+        return 4
+
+
+def test_bounded_time_series():
+    series = BoundedTimeSeries(3)
+    series.extend(make_series([0, 1], False))
+    assert [b.time.day for b in series] == [2, 1]
+
+    # The oldest points are dropped when the buffer is full
+    series.extend(make_series([2, 3], False))
+    assert [b.time.day for b in series] == [4, 3, 2]
+    assert [b.time.day for b in series[1:]] == [3, 2]
+    assert series.time == [datetime(2020, 1, d) for d in (4, 3, 2)]
+    assert series.sorted_times() == [datetime(2020, 1, d) for d in (2, 3, 4)]
+
+    series.set(make_series([7], False))
+    assert [b.time.day for b in series] == [8]
+
+
+def test_live_data_provider_keeps_lookback():
+    context = Context()
+    link = FakeLink(6)
+    asset = add_asset(context, 'TEST', link)
+    LookbackStrategy(context, 'lookback').apply_to_asset(asset)
+    provider = LiveDataProvider(context, context.assets, sleep_time=0)
+
+    # The first fetch fills the buffer, the following fetches overlap with the retrieved bars and only add the new one
+    for fetched in range(1, 5):
+        assert [e.asset for e in provider.retrieve_time_series_data()] == [asset]
+        bars = context.retrieved_data['TEST']['bars']
+        assert [b.time.day for b in bars] == [5 + fetched - i for i in range(4)]
+        assert context.retrieved_data.time == bars[0].time
+
+    # No event when the fetch has no new bar
+    link.fetched -= 1
+    assert provider.retrieve_time_series_data() == []
+    assert len(context.retrieved_data['TEST']['bars']) == 4
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from shinywaffle.backtesting.backtest import Backtester
+from shinywaffle.backtesting.broker import BacktestBroker
+from shinywaffle.common.account import Account
+from shinywaffle.common.assets import assets
+from shinywaffle.common.context import Context
+from shinywaffle.common.event import events
+from shinywaffle.risk.risk_management import BaseRiskManager
+from shinywaffle.strategy.strategy import TradingStrategy
+
+from conftest import make_series, add_asset
+
+
+class ScheduledSignals(TradingStrategy):
+
+    """
+    Emitting a given signal on the bar with a given date
+    """
+
+    def __init__(self, context, signals):
+        super().__init__(context, 'Scheduled signals')
+        self._signals = signals
+
+    def trading_logic(self, asset):
+        bar = self.context.retrieved_data[asset.ticker]['bars'][0]
+        signal = self._signals.get(bar.time.date())
+        if signal is not None:
+            return signal(asset)
+
+
+def run_backtest(tmp_path, columnar, signals, size=10, timeline='bars', days=None):
+    """
+    :param days: The days of the bars after 2020-01-01, every day by default. The opens are 100, 101, 102 etc.
+    :return: The trades of a backtest of ScheduledSignals
+    """
+    context = Context()
+    broker = BacktestBroker(context, 0.)
+    broker.slippages = [0.] * 100
+
+    days = np.arange(size) if days is None else np.asarray(days)
+    asset = add_asset(context, 'TEST', make_series(days, columnar, closes=100.5 + np.arange(days.size)))
+
+    strategy = ScheduledSignals(context, signals)
+    strategy.apply_to_asset(asset)
+    BaseRiskManager(context)
+    account = Account(context, 1000, assets.USD())
+    run_from = datetime(2020, 1, 1) + timedelta(days=int(days[0]))
+    Backtester(context, 'daily', run_from=run_from, run_to=datetime(2020, 1, 1) + timedelta(days=int(days[-1]) + 1),
+               path=str(tmp_path), filename='out', timeline=timeline).run()
+    return account.trade_log.all_trades
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_market_orders_fill_at_next_open(tmp_path, columnar):
+    signals = {
+        datetime(2020, 1, 3).date(): lambda asset: events.SignalEventMarketBuy(asset, 2),
+        datetime(2020, 1, 6).date(): lambda asset: events.SignalEventMarketSell(asset, 2)
+    }
+    trades = run_backtest(tmp_path, columnar, signals)
+
+    # Signals created from the close of a bar are filled at the open of the next bar, not of the same bar
+    assert [(t.trade_side, t.trade_price, t.timestamp) for t in trades] == [
+        ('buy', 103., datetime(2020, 1, 4)),
+        ('sell', 106., datetime(2020, 1, 7))
+    ]
+
+
+@pytest.mark.parametrize('timeline', ['fixed', 'bars'])
+def test_orders_wait_for_next_bar_over_weekend(tmp_path, timeline):
+    # Bars from Thursday to Wednesday without the weekend. The fixed timeline has steps on Saturday and Sunday,
+    # where the asset has no new bar
+    signals = {
+        datetime(2020, 1, 3).date(): lambda asset: events.SignalEventMarketBuy(asset, 2),
+        datetime(2020, 1, 7).date(): lambda asset: events.SignalEventLimitBuy(asset, 1, 103.5)
+    }
+    trades = run_backtest(tmp_path, True, signals, timeline=timeline, days=[1, 2, 5, 6, 7])
+
+    # The Friday signal is filled at the open of Monday, not at the open of Friday on Saturday
+    assert [(t.trade_side, t.trade_price, t.timestamp) for t in trades][:1] == [('buy', 102., datetime(2020, 1, 6))]
+    assert len(trades) == 2
+    assert trades[1].timestamp == datetime(2020, 1, 8)
@@ -0,0 +1,79 @@
+import copy
+from datetime import datetime
+
+import pytest
+
+from shinywaffle.backtesting import orders
+from shinywaffle.common.assets import assets
+from shinywaffle.common.context import Context
+from shinywaffle.common.event import events
+from shinywaffle.common.positions.position import Position
+
+time = datetime(2020, 1, 2)
+
+
+@pytest.fixture
+def asset():
+    return assets.Stock(Context(), 'TEST', 'TEST', assets.USD())
+
+
+def make_events(asset):
+    return [events.TimeSeriesEvent(asset),
+            events.TimeSeriesBatchEvent([asset]),
+            events.SignalEventMarketBuy(asset, 2),
+            events.SignalEventLimitBuy(asset, 2, 99.),
+            events.SignalEventMarketSell(asset, 2),
+            events.SignalEventLimitSell(asset, 2, 101.),
+            events.StopLossEvent(asset, 10.),
+            events.TrailingStopEvent(asset, 10.),
+            events.PendingOrderEvent(0),
+            events.LimitOrderMatchEvent(),
+            events.OrderFilledEvent(asset, 100., 200., 2, 'market', 'buy', 0.1, time)]
+
+
+def make_orders(asset):
+    return [orders.MarketBuyOrder(asset, 2, time),
+            orders.MarketSellOrder(asset, 2, time),
+            orders.LimitBuyOrder(asset, 2, 99., time),
+            orders.LimitSellOrder(asset, 2, 101., time)]
+
+
+def assert_slotted(obj):
+    assert not hasattr(obj, '__dict__')
+    with pytest.raises(AttributeError):
+        obj.misspelled_attribute = 1
+
+    # Copies, like the ones of Context.copy, keep all attributes
+    slots = [name for cls in type(obj).__mro__ for name in getattr(cls, '__slots__', ())]
+    copied = copy.deepcopy(obj)
+    assert [hasattr(copied, name) for name in slots] == [hasattr(obj, name) for name in slots]
+
+
+def test_events_are_slotted(asset):
+    for event in make_events(asset):
+        assert_slotted(event)
+
+    buy = events.SignalEventLimitBuy(asset, 2, 99.)
+    assert (buy.type, buy.side, buy.order_volume, buy.order_limit_price) == ('limit', 'buy', 2, 99.)
+    filled = events.OrderFilledEvent(asset, 100., 200., 2, 'market', 'sell', 0.1, time)
+    assert (filled.price, filled.order_size, filled.side, filled.commission, filled.time) == \
+        (100., 200., 'sell', 0.1, time)
+    assert str(filled) == 'OrderFilledEvent'
+
+
+def test_orders_and_positions_are_slotted(asset):
+    for order in make_orders(asset):
+        assert_slotted(order)
+    assert_slotted(Position(time, asset, 2, 200., 100.))
+
+    order = orders.LimitSellOrder(asset, 2, 101., time)
+    assert (order.id, order.type, order.side, order.order_limit_price, order.filled_price) == \
+        (None, 'limit', 'sell', 101., None)
+
+
+def test_validate(asset, monkeypatch):
+    with pytest.raises(AssertionError):
+        events.TimeSeriesEvent('TEST')
+
+    monkeypatch.setattr(events, 'validate', False)
+    assert events.TimeSeriesEvent('TEST').asset == 'TEST'
@@ -0,0 +1,117 @@
+import random
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from shinywaffle.backtesting.fill_models import SimulatedPathFillModel, VectorizedPathFillModel, \
+    BrownianBridgeFillModel, SubBarFillModel
+from shinywaffle.common.assets import assets
+from shinywaffle.common.context import Context
+from shinywaffle.data.time_series_data import time_series_from_columns, sort_columns
+
+Bar = namedtuple('Bar', ['open', 'high', 'low', 'close'])
+
+
+def make_orders(size=2000):
+    """
+    Synthetic bars with a buy or sell limit order inside each of them. Some of the limit prices are through the open
+    """
+    state = np.random.RandomState(3)
+    opens = 100 + state.normal(0, 5, size)
+    highs = opens + state.uniform(0.5, 3, size)
+    lows = opens - state.uniform(0.5, 3, size)
+    closes = state.uniform(lows, highs)
+    bars = [Bar(*prices) for prices in zip(opens, highs, lows, closes)]
+    limit_prices = state.uniform(lows, highs)
+    sides = np.where(state.random_sample(size) < 0.5, 'buy', 'sell')
+    total_ts = np.where(state.random_sample(size) < 0.8, 1, 3)
+    return bars, limit_prices, sides, total_ts
+
+
+def fill_statistics(model, bars, limit_prices, sides, total_ts):
+    """
+    :return: tuple of the fill rate, the mean and standard deviation of the price improvement relative to the limit
+    price in units of the bar range, and the mean and standard deviation of the fill time
+    """
+    prices, times = model.fill(bars, limit_prices, sides, total_ts)
+    ranges = np.array([bar.high - bar.low for bar in bars])
+    improvement = np.where(sides == 'buy', limit_prices - prices, prices - limit_prices) / ranges
+    filled = ~np.isnan(prices)
+    return filled.mean(), improvement[filled].mean(), improvement[filled].std(), times[filled].mean(), \
+        times[filled].std()
+
+
+@pytest.mark.parametrize('model', [VectorizedPathFillModel(), BrownianBridgeFillModel()],
+                         ids=lambda model: type(model).__name__)
+def test_fill_statistics_match_simulation(model):
+    random.seed(0)
+    np.random.seed(0)
+    orders = make_orders()
+    simulated = fill_statistics(SimulatedPathFillModel(), *orders)
+    modelled = fill_statistics(model, *orders)
+
+    assert modelled[0] == simulated[0] == 1.
+    assert modelled[1] == pytest.approx(simulated[1], abs=0.015)
+    assert modelled[2] == pytest.approx(simulated[2], abs=0.01)
+    assert modelled[3] == pytest.approx(simulated[3], abs=0.02)
+    assert modelled[4] == pytest.approx(simulated[4], abs=0.02)
+
+
+def test_fills_within_bar():
+    np.random.seed(0)
+    bars, limit_prices, sides, total_ts = make_orders(500)
+    prices, times = BrownianBridgeFillModel().fill(bars, limit_prices, sides, total_ts)
+    lows = np.array([bar.low for bar in bars])
+    highs = np.array([bar.high for bar in bars])
+    opens = np.array([bar.open for bar in bars])
+
+    assert np.all((lows <= prices) & (prices <= highs))
+    assert np.all((0 <= times) & (times <= 1))
+    assert np.all(np.where(sides == 'buy', prices <= limit_prices, prices >= limit_prices))
+
+    # Orders with the limit price through the open are filled at the open
+    gap = np.where(sides == 'buy', opens <= limit_prices, opens >= limit_prices)
+    assert gap.any()
+    assert np.all(prices[gap] == opens[gap])
+    assert np.all(times[gap] == 0)
+
+
+def test_limit_outside_bar_not_filled():
+    bars = [Bar(100., 102., 99., 101.)] * 2
+    prices, times = BrownianBridgeFillModel().fill(bars, [98., 103.], ['buy', 'sell'], [1, 1])
+    assert np.isnan(prices).all()
+    assert np.isnan(times).all()
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_sub_bar_fills(columnar):
+    context = Context()
+    asset = assets.Stock(context, 'TEST', 'TEST', assets.USD())
+    days = np.array(['2020-01-02', '2020-01-03', '2020-01-06'], dtype='datetime64[us]')
+    asset.set_bars(time_series_from_columns(sort_columns({
+        'time': days, 'open': np.array([100., 101., 102.]), 'close': np.array([101., 102., 103.]),
+        'high': np.array([103., 104., 105.]), 'low': np.array([98., 99., 100.]), 'volume': np.ones(3, int)
+    }), columnar))
+
+    # Minute bars for 2020-01-03 only, going up from 101 to 104 and down to 99
+    path = 101 + np.concatenate([np.linspace(0, 3, 200), np.linspace(3, -2, 190)])
+    asset.add_data_series('minute', time_series_from_columns(sort_columns({
+        'time': days[1] + np.timedelta64(570, 'm') + np.arange(path.size) * np.timedelta64(1, 'm'),
+        'open': path, 'close': path, 'high': path + 0.05, 'low': path - 0.05, 'volume': np.ones(path.size, int)
+    }), columnar), '1min')
+
+    model = SubBarFillModel(context, 'minute', fallback=BrownianBridgeFillModel())
+    bar = asset.bars[1]
+    prices, times = model.fill([bar] * 4, [99.5, 103.9, 100.8, 101.5], ['buy', 'sell', 'sell', 'buy'], [1] * 4,
+                               ['TEST'] * 4)
+
+    # The limit price is reached inside a sub bar, or the first sub bar opens through it
+    assert prices.tolist() == [99.5, 103.9, 101., 101.]
+    assert times[0] > times[1] > times[2] == times[3]
+
+    # Bars without sub bars are filled with the fallback model
+    np.random.seed(0)
+    fallback = BrownianBridgeFillModel().fill([asset.bars[0]], [101.], ['buy'], [3])
+    np.random.seed(0)
+    assert model.fill([asset.bars[0]], [101.], ['buy'], [3], ['TEST'])[0] == fallback[0]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from shinywaffle.data.intrabar_simulation import simulate_intrabar_paths, first_crossing
+
+
+def make_bars(size=200):
+    state = np.random.RandomState(5)
+    opens = 100 + state.normal(0, 5, size)
+    highs = opens + state.uniform(0.5, 3, size)
+    lows = opens - state.uniform(0.5, 3, size)
+    closes = state.uniform(lows, highs)
+    return opens, highs, lows, closes
+
+
+@pytest.mark.parametrize('total_t, dt', [(1, 0.01), (3, 0.01), (1, 0.25)])
+def test_path_shape(total_t, dt):
+    np.random.seed(0)
+    paths = simulate_intrabar_paths(*make_bars(), total_t, dt)
+    assert paths.shape == (200, 3 * round(total_t / dt) + 1)
+
+    # A single bar gives a single row
+    assert simulate_intrabar_paths(100., 101., 99., 100.5, total_t, dt).shape == (1, 3 * round(total_t / dt) + 1)
+
+
+def test_paths_hit_bar_prices():
+    np.random.seed(0)
+    opens, highs, lows, closes = make_bars()
+    paths = simulate_intrabar_paths(opens, highs, lows, closes, 1, 0.01)
+    n = 100
+
+    assert np.array_equal(paths[:, 0], opens)
+    assert np.array_equal(paths[:, -1], closes)
+
+    # The low and the high are the two middle end points, in either order
+    low_first = paths[:, n] == lows
+    assert np.all(np.where(low_first, paths[:, 2 * n] == highs, (paths[:, n] == highs) & (paths[:, 2 * n] == lows)))
+    assert 0 < low_first.mean() < 1
+
+
+def test_paths_within_bar():
+    np.random.seed(0)
+    opens, highs, lows, closes = make_bars()
+    paths = simulate_intrabar_paths(opens, highs, lows, closes, 1, 0.01, stdev_dampening=2)
+    assert np.all(paths >= lows[:, None])
+    assert np.all(paths <= highs[:, None])
+    assert np.all(paths.min(axis=1) == lows)
+    assert np.all(paths.max(axis=1) == highs)
+
+    # A bar without range is flat
+    assert np.all(simulate_intrabar_paths(100., 100., 100., 100., 1, 0.1) == 100.)
+
+
+def test_first_crossing():
+    paths = np.array([[10., 9., 8., 7., 8.],
+                      [10., 11., 12., 11., 10.],
+                      [10., 10.5, 11., 10.5, 10.]])
+    indices, prices = first_crossing(paths, [8.5, 11.5, 9.], ['buy', 'sell', 'buy'])
+    assert indices.tolist() == [2, 2, -1]
+    assert prices[:2].tolist() == [8., 12.]
+    assert np.isnan(prices[2])
+
+    # Reaching the limit price exactly is a crossing, and a path starting through it crosses at the first price
+    indices, prices = first_crossing(paths, 10., 'sell')
+    assert indices.tolist() == [0, 0, 0]
+    assert prices.tolist() == [10., 10., 10.]
+
+    indices, prices = first_crossing(paths[0], 7., 'buy')
+    assert indices.tolist() == [3]
+    assert prices.tolist() == [7.]
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import pytest
+
+from shinywaffle.backtesting import orders
+from shinywaffle.common.assets import assets
+from shinywaffle.common.context import Context
+from shinywaffle.common.event import events
+
+time = datetime(2020, 1, 2)
+
+
+@pytest.fixture
+def book():
+    context = Context()
+    context.retrieved_data.time = time
+    for ticker in ('A', 'B'):
+        assets.Stock(context, ticker, ticker, assets.USD())
+    return orders.OrderBook(context)
+
+
+def place(book, *new_orders):
+    return [book.new_order(order).order_id for order in new_orders]
+
+
+def test_lookup_by_id_type_and_asset(book):
+    a, b = book.context.assets['A'], book.context.assets['B']
+    ids = place(book, orders.MarketBuyOrder(a, 1, time), orders.LimitSellOrder(a, 1, 101., time),
+                orders.LimitBuyOrder(b, 1, 99., time), orders.MarketSellOrder(a, 1, time),
+                orders.LimitBuyOrder(a, 1, 98., time))
+    assert ids == [0, 1, 2, 3, 4]
+    assert [book.get_by_id(i).id for i in ids] == ids
+    assert book.get_by_id(5) is None
+
+    assert list(book.pending_orders[orders.LimitBuyOrder]) == [2, 4]
+    assert list(book.pending_orders[orders.MarketSellOrder]) == [3]
+
+    assert [o.id for o in book.get_by_asset('A')] == [0, 1, 3, 4]
+    assert [o.id for o in book.get_by_asset('A', 'buy')] == [0, 4]
+    assert [o.id for o in book.get_by_asset('A', 'sell')] == [1, 3]
+    assert [o.id for o in book.get_by_asset('B')] == [2]
+    assert book.get_by_asset('C') == []
+
+    assert len(book.limit_books['A']) == 2
+    assert len(book.limit_books['B']) == 1
+
+
+def test_cancel_order(book):
+    a = book.context.assets['A']
+    market, limit = place(book, orders.MarketBuyOrder(a, 1, time), orders.LimitBuyOrder(a, 1, 99., time))
+
+    cancelled = book.cancel_order(limit)
+    assert cancelled.id == limit
+    assert book.cancelled_orders == [cancelled]
+
+    # The order is removed from every index
+    assert book.get_by_id(limit) is None
+    assert not book.pending_orders[orders.LimitBuyOrder]
+    assert [o.id for o in book.get_by_asset('A', 'buy')] == [market]
+    assert len(book.limit_books['A']) == 0
+    assert book.limit_books['A'].in_range(0, 1000) == []
+
+    # Cancelling it again, or an order that does not exist, does nothing
+    assert book.cancel_order(limit) is None
+    assert book.cancel_order(10) is None
+    assert book.cancelled_orders == [cancelled]
+
+
+def test_fill_order(book):
+    a = book.context.assets['A']
+    market, limit = place(book, orders.MarketSellOrder(a, 2, time), orders.LimitSellOrder(a, 1, 101., time))
+
+    filled = book.fill_order(market, 100., 200., 0.2)
+    assert isinstance(filled, events.OrderFilledEvent)
+    assert (filled.price, filled.order_size, filled.order_volume, filled.type, filled.side, filled.commission,
+            filled.time) == (100., 200., 2, 'market', 'sell', 0.2, time)
+    assert book.get_by_id(market) is None
+    assert [o.id for o in book.filled_orders[orders.MarketSellOrder]] == [market]
+    assert [o.id for o in book.get_by_asset('A')] == [limit]
+    with pytest.raises(KeyError):
+        book.fill_order(market, 100., 200., 0.2)
+
+
+def test_update_post_event_stack(book):
+    a = book.context.assets['A']
+    assert book.update_post_event_stack() == []
+
+    place(book, orders.LimitBuyOrder(a, 1, 99., time), orders.MarketSellOrder(a, 1, time),
+          orders.MarketBuyOrder(a, 1, time), orders.LimitSellOrder(a, 1, 101., time))
+    pending = book.update_post_event_stack()
+
+    # One event per market order, buys first, and a single event matching all limit orders
+    assert [e.order_id for e in pending[:2]] == [2, 1]
+    assert isinstance(pending[2], events.LimitOrderMatchEvent)
+    assert (pending[2].tickers, pending[2].latest_id) == (['A'], 4)
+    assert len(pending) == 3
+
+    # Only the market orders of the assets with a new bar are checked
+    place(book, orders.MarketBuyOrder(book.context.assets['B'], 1, time))
+    assert [e.order_id for e in book.update_post_event_stack({'B'})] == [4]
+    assert book.update_post_event_stack(set()) == []
+
+
+def test_limit_book_range_boundaries(book):
+    a = book.context.assets['A']
+    buy_ids = place(book, orders.LimitBuyOrder(a, 1, 101., time), orders.LimitBuyOrder(a, 1, 100., time),
+                    orders.LimitBuyOrder(a, 1, 101., time), orders.LimitBuyOrder(a, 1, 103., time),
+                    orders.LimitBuyOrder(a, 1, 103.5, time))
+    sell_ids = place(book, orders.LimitSellOrder(a, 1, 103., time), orders.LimitSellOrder(a, 1, 102., time))
+    limit_book = book.limit_books['A']
+
+    # The limit prices at the low and at the high are inside the range, and equal prices are in the order placed
+    assert [o.id for o in limit_book.in_range(101., 103.)] == [buy_ids[0], buy_ids[2], buy_ids[3], sell_ids[1],
+                                                               sell_ids[0]]
+    assert [o.id for o in limit_book.in_range(101., 103., 'sell')] == [sell_ids[1], sell_ids[0]]
+    assert [o.id for o in limit_book.in_range(101., 101., 'buy')] == [buy_ids[0], buy_ids[2]]
+    assert limit_book.in_range(101.5, 101.9) == []
+    assert limit_book.in_range(103.6, 104.) == []
+
+    # Removing one of the orders with the same limit price keeps the other one
+    book.cancel_order(buy_ids[0])
+    assert [o.id for o in limit_book.in_range(101., 101.)] == [buy_ids[2]]
+    assert len(limit_book) == 6
@@ -0,0 +1,86 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from shinywaffle.backtesting.backtest import Backtester
+from shinywaffle.backtesting.broker import BacktestBroker
+from shinywaffle.common.account import Account
+from shinywaffle.common.assets import assets
+from shinywaffle.common.context import Context
+from shinywaffle.risk.risk_management import BaseRiskManager
+from shinywaffle.strategy.sma_crossover import AverageCrossOver
+from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average
+
+from conftest import make_series, add_asset
+
+
+class FunctionColumn:
+
+    """
+    Computing simple_moving_average on every lookup, like AverageCrossOver did before the columns
+    """
+
+    def __init__(self, window):
+        self.window = window
+
+    def at(self, data_series, offset=0):
+        return simple_moving_average(data_series, self.window, ["close", "high", "low"], offset=offset)
+
+
+class FunctionCrossOver(AverageCrossOver):
+
+    def column(self, asset, name, column_function, window, *args, **kwargs):
+        return FunctionColumn(window)
+
+
+class BatchCrossOver(AverageCrossOver):
+
+    """
+    AverageCrossOver called once per step with all updated assets
+    """
+
+    def batch_trading_logic(self, assets, prices):
+        for asset, close in zip(assets, prices['close']):
+            assert close == self.context.retrieved_data[asset.ticker]['bars'].close[0]
+        return [self.trading_logic(asset) for asset in assets]
+
+
+def run_crossover(tmp_path, strategy_class, size=400, tickers=('TEST',), columnar=True):
+    """
+    :return: The trades of AverageCrossOver on bars with flat stretches, where the moving averages are equal
+    """
+    random.seed(0)
+    np.random.seed(0)
+    context = Context()
+    BacktestBroker(context, 0.).slippages = [0.] * 1000
+
+    asset_objects = []
+    for i, ticker in enumerate(tickers):
+        closes = 10 + np.cumsum(np.random.RandomState(2 + i).normal(0, 0.1, size))
+        for start in range(50, size, 100):
+            closes[start:start + 40] = 0.1 + closes[start] // 0.1 * 0.1
+        asset_objects.append(add_asset(context, ticker, make_series(np.arange(size), columnar, closes, spread=0.3)))
+
+    strategy_class(context, short=5, long=20).apply_to_asset(*asset_objects)
+    BaseRiskManager(context)
+    account = Account(context, 10000, assets.USD())
+    Backtester(context, 'daily', run_from=datetime(2020, 1, 1), run_to=datetime(2020, 1, 1) + timedelta(days=size),
+               path=str(tmp_path), filename='out', timeline='bars').run()
+    return [(t.asset.ticker, t.trade_side, t.trade_price, t.timestamp) for t in account.trade_log.all_trades]
+
+
+def test_crossover_signals_match_function(tmp_path):
+    trades = run_crossover(tmp_path, AverageCrossOver)
+    assert trades
+    assert trades == run_crossover(tmp_path, FunctionCrossOver)
+
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_batch_crossover_matches_per_asset(tmp_path, columnar):
+    tickers = ('A', 'B', 'C')
+    trades = run_crossover(tmp_path, AverageCrossOver, tickers=tickers, columnar=columnar)
+    assert {t[0] for t in trades} == set(tickers)
+    assert trades == run_crossover(tmp_path, BatchCrossOver, tickers=tickers, columnar=columnar)
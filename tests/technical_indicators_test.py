@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shinywaffle.common.context import Context
+from shinywaffle.strategy.strategy import TradingStrategy
+from shinywaffle.data.time_series_data import time_series_from_columns, TimeSeriesView
+from shinywaffle.technical_indicators import TooSmallWindowException
+from shinywaffle.technical_indicators.simple_moving_average import simple_moving_average, \
+    simple_moving_average_column, simple_moving_average_grid, SimpleMovingAverage
+from shinywaffle.technical_indicators.exponential_moving_average import exponential_moving_average, \
+    exponential_moving_average_column, ExponentialMovingAverage
+from shinywaffle.technical_indicators.rsi import rsi, rsi_column, RelativeStrengthIndex
+from shinywaffle.technical_indicators.bollinger_bands import bollinger_bands, bollinger_bands_column, BollingerBands
+from shinywaffle.technical_indicators.atr import atr, atr_column, AverageTrueRange
+from shinywaffle.technical_indicators.macd import macd, macd_column, macd_lookback, \
+    MovingAverageConvergenceDivergence
+from shinywaffle.technical_indicators.vwap import vwap, vwap_column, VolumeWeightedAveragePrice
+from shinywaffle.technical_indicators.stochastic_oscillator import stochastic_oscillator, \
+    stochastic_oscillator_column, StochasticOscillator
+from shinywaffle.technical_indicators.z_score import z_score, z_score_column, ZScore
+from shinywaffle.technical_indicators.donchian_channels import donchian_channels, donchian_channels_column, \
+    DonchianChannels
+
+from conftest import add_asset
+
+# (indicator function, column function, streaming class, args after data_series)
+indicators = [
+    (simple_moving_average, simple_moving_average_column, SimpleMovingAverage, (10, ['close', 'high', 'low'])),
+    (exponential_moving_average, exponential_moving_average_column, ExponentialMovingAverage, (10, ['close'])),
+    (rsi, rsi_column, RelativeStrengthIndex, (14, ['close'])),
+    (bollinger_bands, bollinger_bands_column, BollingerBands, (20, ['close'])),
+    (atr, atr_column, AverageTrueRange, (14, ['high', 'low', 'close'])),
+    (macd, macd_column, MovingAverageConvergenceDivergence, (26, ['close'])),
+    (vwap, vwap_column, VolumeWeightedAveragePrice, (20, ['high', 'low', 'close'])),
+    (stochastic_oscillator, stochastic_oscillator_column, StochasticOscillator, (14, ['high', 'low', 'close'])),
+    (z_score, z_score_column, ZScore, (20, ['close'])),
+    (donchian_channels, donchian_channels_column, DonchianChannels, (20, ['high', 'low'])),
+]
+
+
+def make_bars(columnar, size=300):
+    random = np.random.RandomState(1)
+    close = 100 + np.cumsum(random.normal(0, 1, size))
+    high = close + random.uniform(0, 2, size)
+    low = close - random.uniform(0, 2, size)
+
+    # A flat stretch, where the range of the stochastic oscillator is empty
+    close[100:130] = high[100:130] = low[100:130] = close[100]
+
+    times = np.datetime64('2020-01-01') + np.arange(size)[::-1]
+    return time_series_from_columns({
+        'time': times.astype('datetime64[us]'),
+        'open': close[::-1].copy(),
+        'close': close[::-1].copy(),
+        'high': high[::-1].copy(),
+        'low': low[::-1].copy(),
+        'volume': random.randint(1, 1000, size)[::-1].astype(np.int64)
+    }, columnar)
+
+
+def assert_same(a, b):
+    if a is TooSmallWindowException or b is TooSmallWindowException:
+        assert a is b
+    else:
+        assert np.allclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+@pytest.mark.parametrize('function, column_function, streaming_class, args', indicators)
+def test_vectorized_and_streaming_agree(columnar, function, column_function, streaming_class, args):
+    bars = make_bars(columnar)
+    view = TimeSeriesView(bars)
+    column = column_function(view, *args)
+    streaming = streaming_class(*args)
+
+    for i in range(len(bars)):
+        view.advance(bars.next_time(i))
+        expected = function(view, *args)
+        assert_same(column.at(view), expected)
+        assert_same(column.at(view, offset=1), function(view, *args, offset=1))
+        assert_same(streaming.update(view), expected)
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_macd_depends_on_lookback_only(columnar):
+    bars = make_bars(columnar)
+    lookback = macd_lookback(26)
+    full = TimeSeriesView(bars)
+    bounded = TimeSeriesView(bars, maxlen=lookback)
+    column = macd_column(full, 26, ['close'])
+
+    for time in [bars.next_time(i) for i in range(lookback, len(bars))]:
+        full.advance(time)
+        bounded.advance(time)
+        assert len(bounded) == lookback < len(full)
+        assert macd(full, 26, ['close']) == macd(bounded, 26, ['close'])
+        assert_same(column.at(bounded), macd(bounded, 26, ['close']))
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+@pytest.mark.parametrize('function, column_function, streaming_class, args', indicators)
+def test_column_lookups(columnar, function, column_function, streaming_class, args):
+    bars = make_bars(columnar)
+    column = column_function(bars, *args)
+
+    # Views bounded to a few points more than the lookback, so the larger offsets fall back to the function
+    view = TimeSeriesView(bars, maxlen=column.lookback + 2)
+    for i in range(0, len(bars), 7):
+        view.advance(bars.next_time(i))
+        for offset in range(5):
+            assert_same(column.at(view, offset=offset), function(view, *args, offset=offset))
+
+    # Series that are not views of the source are computed with the function
+    assert_same(column.at(bars), function(bars, *args))
+    other = make_bars(columnar)
+    other_view = TimeSeriesView(other)
+    other_view.advance(other.next_time(len(other) - 1))
+    assert_same(column.at(other_view, offset=3), function(other_view, *args, offset=3))
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_grid_matches_function(columnar):
+    bars = make_bars(columnar)
+    grid = simple_moving_average_grid(bars, [2, 5, 50], ['close', 'high'])
+    columns = dict(grid.columns)
+
+    # Windows requested later are added without recomputing the others
+    assert grid[10] is grid.column(10)
+    assert sorted(grid.columns) == [2, 5, 10, 50]
+    assert all(grid.columns[window] is column for window, column in columns.items())
+
+    view = TimeSeriesView(bars)
+    for i in range(0, len(bars), 3):
+        view.advance(bars.next_time(i))
+        for window in grid.columns:
+            for offset in (0, 1, 7):
+                expected = simple_moving_average(view, window, ['close', 'high'], offset=offset)
+                value = grid[window].at(view, offset=offset)
+                if expected is TooSmallWindowException:
+                    assert value is expected
+                else:
+                    assert value == pytest.approx(expected, rel=1e-12)
+
+    # Past the end of the series, the rows of the grid are nan
+    assert np.isnan(grid[50].values[-49:]).all()
+    assert not np.isnan(grid[50].values[:-49]).any()
+
+
+def test_grids_are_shared_by_context_copies():
+    context = Context()
+    asset = add_asset(context, 'TEST', make_bars(True))
+    context.retrieved_data['TEST']['bars'] = TimeSeriesView(asset.bars)
+    grid = TradingStrategy(context, 'grid').grid(asset, simple_moving_average_grid, [5, 10], ['close'])
+
+    # A copy of the context, like the one of a workflow run, finds the grid and adds its windows to it
+    copied = context.copy()
+    copied_asset = copied.assets['TEST']
+    assert copied_asset.bars is asset.bars
+    copied.retrieved_data['TEST']['bars'] = TimeSeriesView(copied_asset.bars)
+    assert copied.strategies['grid'].grid(copied_asset, simple_moving_average_grid, [10, 20], ['close']) is grid
+    assert sorted(grid.columns) == [5, 10, 20]
+
+
+def test_recursive_streaming_indicators():
+    bars = make_bars(True)
+    closes = bars.close[::-1]
+
+    ema = ExponentialMovingAverage(10, ['close'], recursive=True)
+    expected = pd.Series(closes).ewm(alpha=2 / 11, adjust=False).mean().to_numpy()
+    for i, close in enumerate(closes):
+        ema.push(close)
+        assert_same(ema.value, expected[i] if i >= 9 else TooSmallWindowException)
+
+    # Wilder's RSI is seeded with the mean of the first 14 gains and losses, and after that smoothed with alpha 1 / 14
+    changes = np.diff(closes)
+    averages = [pd.Series(np.concatenate([[np.mean(side[:14])], side[14:]])).ewm(alpha=1 / 14, adjust=False).mean()
+                for side in (np.maximum(changes, 0), np.maximum(-changes, 0))]
+    expected = 100 - 100 / (1 + averages[0] / averages[1])
+    wilder = RelativeStrengthIndex(14, ['close'], wilder=True)
+    for i, close in enumerate(closes):
+        wilder.push(close)
+        assert_same(wilder.value, expected[i - 14] if i >= 14 else TooSmallWindowException)
+
+
+def test_macd_with_large_window():
+    # The memory of the column and the streaming class does not grow with the square of the lookback
+    bars = make_bars(True)
+    column = macd_column(bars, 100000, ['close'])
+    streaming = MovingAverageConvergenceDivergence(100000, ['close'])
+    assert np.isnan(column.values).all()
+    assert streaming.update(bars) is TooSmallWindowException
+
+
+def test_indicator_cache():
+    context = Context()
+    asset = add_asset(context, 'TEST', make_bars(True))
+    view = context.retrieved_data['TEST']['bars'] = TimeSeriesView(asset.bars)
+    view.advance(asset.bars.next_time(49))
+    context.retrieved_data.time = view[0].time
+    cache = context.indicator_cache
+
+    calls = []
+
+    def counted(data_series, window, attributes, offset=0, **kwargs):
+        calls.append((window, offset, kwargs))
+        return bollinger_bands(data_series, window, attributes, offset=offset, **kwargs)
+
+    value = cache.compute(counted, asset, 20, ['close'])
+    assert value == bollinger_bands(view, 20, ['close'])
+    assert cache.compute(counted, asset, 20, ['close']) is value
+    assert cache.compute(counted, asset, 20, 'close') is value
+    assert cache.report() == {'hits': 2, 'misses': 1}
+
+    # The offset, the attributes and the other keyword arguments are part of the key
+    cache.compute(counted, asset, 20, ['close'], offset=1)
+    cache.compute(counted, asset, 20, ['high'])
+    cache.compute(counted, asset, 20, ['close'], num_stdev=3)
+    cache.compute(counted, asset, 20, ['close'], num_stdev=3)
+    assert calls == [(20, 0, {}), (20, 1, {}), (20, 0, {}), (20, 0, {'num_stdev': 3})]
+    assert cache.report() == {'hits': 3, 'misses': 4}
+
+    # The values are dropped when the step advances
+    view.advance(asset.bars.next_time(50))
+    context.retrieved_data.time = view[0].time
+    assert cache.compute(counted, asset, 20, ['close']) == bollinger_bands(view, 20, ['close'])
+    assert len(cache.values) == 1
+    assert cache.report() == {'hits': 3, 'misses': 5}
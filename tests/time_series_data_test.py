@@ -0,0 +1,134 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from shinywaffle.data.time_series_data import DataSeriesContainer, ColumnarTimeSeries, DataPoint, TimeSeries, \
+    TimeSeriesView, time_series_from_columns
+
+from conftest import make_series
+
+
+def as_tuple(bar):
+    return bar.time, bar.open, bar.close, bar.high, bar.low, bar.volume
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_data_series_container(columnar):
+    container = DataSeriesContainer()
+    minute = make_series(np.arange(5), columnar)
+    sentiment = make_series(np.arange(3), columnar)
+    container.add(minute, 'minute', '1min')
+    container.add(sentiment, 'sentiment')
+
+    # Item and attribute access both return the series
+    assert container['minute'] is container.minute is minute
+    assert container['sentiment'] is container.sentiment is sentiment
+
+    entry = container.entry('minute')
+    assert (entry.name, entry.series, entry.interval) == ('minute', minute, '1min')
+    assert set(entry.columns) >= {'time', 'open', 'high', 'low', 'close', 'volume'}
+    assert [e.name for e in container.entries()] == ['minute', 'sentiment']
+    assert container.time_series() == [('minute', minute), ('sentiment', sentiment)]
+
+    with pytest.raises(KeyError):
+        container['daily']
+    with pytest.raises(AssertionError):
+        container.add(minute, 'registry')
+
+
+def test_columnar_time_series():
+    columnar, series = make_series(np.arange(20), True), make_series(np.arange(20), False)
+    assert isinstance(columnar, ColumnarTimeSeries)
+    assert len(columnar) == len(series) == 20
+
+    # Indexing and iterating builds the same bars as the list-backed series, newest first
+    assert [as_tuple(b) for b in columnar] == [as_tuple(b) for b in series]
+    assert as_tuple(columnar[0]) == as_tuple(series[0])
+    assert columnar[0].time == datetime(2020, 1, 20)
+    assert as_tuple(columnar[-1]) == as_tuple(series[-1])
+    assert [as_tuple(b) for b in columnar[2:8:3]] == [as_tuple(b) for b in series[2:8:3]]
+    with pytest.raises(IndexError):
+        columnar[20]
+
+    # The attributes are the columns themselves, not copies
+    for name in ('open', 'close', 'high', 'low', 'volume'):
+        assert getattr(columnar, name) is columnar.columns[name] is columnar.get(name)
+        assert getattr(columnar, name).tolist() == getattr(series, name)
+    assert np.shares_memory(columnar.close[:5], columnar.columns['close'])
+    assert columnar.time.tolist() == series.time
+
+    # retrieve returns the points where from_time < time <= to_time, like the list-backed series
+    ranges = [(datetime(2020, 1, 3), datetime(2020, 1, 9)), (datetime(2019, 1, 1), datetime(2021, 1, 1)),
+              (datetime(2020, 1, 9), datetime(2020, 1, 9)), (datetime(2021, 1, 1), datetime(2022, 1, 1))]
+    for from_time, to_time in ranges:
+        retrieved = columnar.retrieve(from_time, to_time)
+        assert isinstance(retrieved, ColumnarTimeSeries)
+        assert [as_tuple(b) for b in retrieved] == [as_tuple(b) for b in series.retrieve(from_time, to_time)]
+    assert np.shares_memory(columnar.retrieve(datetime(2020, 1, 3), datetime(2020, 1, 9)).close, columnar.close)
+
+
+def test_columnar_data_points():
+    columns = {'datetime': (np.datetime64('2020-01-01') + np.arange(3)).astype('datetime64[us]'),
+               'sentiment': np.array([0.5, -0.25, 1.])}
+    columnar = time_series_from_columns(columns, True, DataPoint)
+    series = time_series_from_columns(columns, False, DataPoint)
+    assert isinstance(series, TimeSeries) and not isinstance(series, ColumnarTimeSeries)
+
+    assert isinstance(columnar[0], DataPoint)
+    assert [(p.datetime, p.sentiment) for p in columnar] == [(p.datetime, p.sentiment) for p in series]
+    assert columnar.sentiment.tolist() == [1., -0.25, 0.5]
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_time_series_view(columnar):
+    source = make_series(np.arange(10), columnar)
+    view = TimeSeriesView(source)
+    assert len(view) == 0
+    assert view.next_time() == datetime(2020, 1, 1)
+
+    # Advancing reveals the points up to and including the time, the oldest first
+    assert view.advance(datetime(2020, 1, 3)) == 3
+    assert (len(view), view.start, view.end) == (3, 7, 3)
+    assert view[0].time == datetime(2020, 1, 3)
+    assert view.next_time() == datetime(2020, 1, 4)
+    assert view.advance(datetime(2020, 1, 3, 12)) == 0
+    assert view.advance(datetime(2020, 1, 5)) == 2
+    assert [as_tuple(b) for b in view] == [as_tuple(b) for b in source[5:]]
+    assert [as_tuple(b) for b in view[1:3]] == [as_tuple(b) for b in source[6:8]]
+    assert list(view.close) == list(source.close[5:])
+    with pytest.raises(IndexError):
+        view[5]
+
+    assert view.advance(datetime(2021, 1, 1)) == 5
+    assert view.next_time() is None
+    with pytest.raises(TypeError):
+        view.extend(source)
+
+
+@pytest.mark.parametrize('columnar', [True, False])
+def test_time_series_view_maxlen(columnar):
+    source = make_series(np.arange(10), columnar)
+    view = TimeSeriesView(source, maxlen=3)
+    view.advance(datetime(2020, 1, 2))
+    assert len(view) == 2
+
+    # Only the maxlen latest points are visible, the end pointer still counts all revealed points
+    view.advance(datetime(2020, 1, 6))
+    assert (len(view), view.end) == (3, 6)
+    assert [b.time.day for b in view] == [6, 5, 4]
+    assert [b.time.day for b in view[-2:]] == [5, 4]
+    assert len(view.close) == 3
+    with pytest.raises(IndexError):
+        view[3]
+
+
+def test_time_series_view_is_zero_copy():
+    source = make_series(np.arange(10), True)
+    view = TimeSeriesView(source)
+    view.advance(datetime(2020, 1, 6))
+
+    # The attributes are views of the source columns, so advancing does not copy any data
+    for name in ('time', 'open', 'close', 'high', 'low', 'volume'):
+        assert np.shares_memory(getattr(view, name), source.columns[name])
+    assert np.array_equal(view.close[:2], source.close[4:6])
@@ -2,6 +2,7 @@ from backtesting.workflow.workflow import BacktestWorkflow
 from backtesting.workflow.uncertainty_variable import UncertaintyVariable
 from datetime import datetime
 from data.bar_provider import BarProvider
+from data.data_cache import DataCache
 from backtesting.backtest import Backtester
 from risk.risk_management import BaseRiskManager
 from common.assets import assets
@@ -11,6 +12,7 @@ from strategy import sma_crossover
 from common.context import Context
 
 context = Context()
+cache = DataCache()
 
 broker = BacktestBroker(context, 0.)
 trading_strategy = sma_crossover.AverageCrossOver(context=context,
@@ -20,17 +22,17 @@ trading_strategy = sma_crossover.AverageCrossOver(context=context,
 
 # Nvidia stocks
 nvidia = assets.Stock(context, "Nvidia", "NVDA", assets.USD())
-nvidia_bars = BarProvider('/shinywaffle/data/yahoo_finance/NVDA_1D.csv', '%Y-%m-%d')
+nvidia_bars = BarProvider('/shinywaffle/data/yahoo_finance/NVDA_1D.csv', '%Y-%m-%d', cache=cache)
 nvidia.set_bars(nvidia_bars)
 
 # Oracle stocks
 oracle = assets.Stock(context, "Oracle", "ORCL", assets.USD())
-oracle_bars = BarProvider('/shinywaffle/data/yahoo_finance/ORCL_1D.csv', '%Y-%m-%d')
+oracle_bars = BarProvider('/shinywaffle/data/yahoo_finance/ORCL_1D.csv', '%Y-%m-%d', cache=cache)
 oracle.set_bars(oracle_bars)
 
 # IBM stocks
 ibm = assets.Stock(context, "IBM", "IBM", assets.USD())
-ibm_bars = BarProvider('/shinywaffle/data/yahoo_finance/IBM_1D.csv', '%Y-%m-%d')
+ibm_bars = BarProvider('/shinywaffle/data/yahoo_finance/IBM_1D.csv', '%Y-%m-%d', cache=cache)
 ibm.set_bars(ibm_bars)
 
 trading_strategy.apply_to_asset(nvidia, oracle, ibm)